@@ -0,0 +1,130 @@
+import http from "http";
+import axios from "axios";
+
+// Every call from this gateway to FastAPI goes through one keep-alive agent,
+// so requests reuse warm connections instead of opening a socket each.
+const FASTAPI_URL = process.env.FASTAPI_URL || "http://localhost:8000";
+const KEEPALIVE = process.env.FASTAPI_KEEPALIVE !== "0";
+// Upper bound on concurrent connections to FastAPI; further requests queue in the agent.
+const MAX_SOCKETS = Number(process.env.FASTAPI_MAX_SOCKETS || 64);
+const MAX_FREE_SOCKETS = Number(process.env.FASTAPI_MAX_FREE_SOCKETS || 16);
+// Idle sockets are dropped before uvicorn's 5s keep-alive timeout closes them under us.
+const FREE_SOCKET_TIMEOUT_MS = Number(process.env.FASTAPI_FREE_SOCKET_TIMEOUT_MS || 4000);
+
+const stats = {
+  socketsCreated: 0,
+  streamsOpen: 0,
+  streamsTotal: 0,
+  clientAborts: 0,
+  upstreamErrors: 0,
+};
+
+class CountingAgent extends http.Agent {
+  createConnection(...args) {
+    stats.socketsCreated += 1;
+    return super.createConnection(...args);
+  }
+}
+
+const agent = new CountingAgent({
+  keepAlive: KEEPALIVE,
+  maxSockets: MAX_SOCKETS,
+  maxFreeSockets: MAX_FREE_SOCKETS,
+  timeout: FREE_SOCKET_TIMEOUT_MS,
+});
+
+export const fastapi = axios.create({ baseURL: FASTAPI_URL, httpAgent: agent });
+
+const countSockets = (pool) => Object.values(pool).reduce((n, sockets) => n + sockets.length, 0);
+
+export function proxyStats() {
+  return {
+    ...stats,
+    keepAlive: KEEPALIVE,
+    maxSockets: MAX_SOCKETS,
+    socketsActive: countSockets(agent.sockets),
+    socketsFree: countSockets(agent.freeSockets),
+    requestsQueued: countSockets(agent.requests),
+  };
+}
+
+const readBody = async (stream) => {
+  let body = "";
+  for await (const chunk of stream) body += chunk;
+  return body;
+};
+
+// Final event for a stream that broke after headers were sent, in the stream's own format.
+const errorEvent = (contentType, message) => {
+  const line = JSON.stringify({ error: message });
+  return contentType === "application/x-ndjson" ? `${line}\n` : `data: ${line}\n\n`;
+};
+
+// Streams a FastAPI response to the client chunk by chunk, without buffering.
+// Upstream error statuses (e.g. 429 from admission control) are passed
+// through before any headers are sent; connection failures become 502. If
+// the client goes away, the upstream connection is destroyed, which makes
+// FastAPI cancel the generator and its Gemini call.
+export async function proxyStream(res, path, body, { contentType = "text/event-stream", label = path } = {}) {
+  const controller = new AbortController();
+  let upstream = null;
+  const onClose = () => {
+    if (res.writableFinished) return;
+    stats.clientAborts += 1;
+    controller.abort();
+    if (upstream) upstream.data.destroy();
+  };
+  res.on("close", onClose);
+
+  try {
+    upstream = await fastapi.post(path, body, {
+      responseType: "stream",
+      signal: controller.signal,
+      validateStatus: () => true,
+    });
+  } catch (error) {
+    res.off("close", onClose);
+    if (controller.signal.aborted) return;
+    stats.upstreamErrors += 1;
+    console.error(`Error proxying ${label}:`, error.message);
+    return res.status(502).json({ error: `Error calling ${label} endpoint`, detail: error.message });
+  }
+  if (controller.signal.aborted) {
+    upstream.data.destroy();
+    return;
+  }
+
+  if (upstream.status >= 400) {
+    res.off("close", onClose);
+    const text = await readBody(upstream.data).catch(() => "");
+    const retryAfter = upstream.headers["retry-after"];
+    if (retryAfter) res.setHeader("Retry-After", retryAfter);
+    try {
+      return res.status(upstream.status).json(JSON.parse(text));
+    } catch {
+      return res.status(upstream.status).json({ error: `Error calling ${label} endpoint`, detail: text });
+    }
+  }
+
+  res.setHeader("Content-Type", contentType);
+  res.setHeader("Cache-Control", "no-cache");
+  res.setHeader("X-Accel-Buffering", "no");
+  res.flushHeaders();
+
+  stats.streamsOpen += 1;
+  stats.streamsTotal += 1;
+  // pipe() forwards each chunk as it arrives and pauses FastAPI when the client reads slowly.
+  upstream.data.pipe(res, { end: false });
+  upstream.data.on("end", () => res.end());
+  upstream.data.on("close", () => {
+    stats.streamsOpen -= 1;
+    res.off("close", onClose);
+    if (!upstream.data.readableEnded && !res.destroyed && !res.writableEnded) {
+      // FastAPI dropped the connection mid-stream.
+      stats.upstreamErrors += 1;
+      console.error(`Upstream ${label} closed early`);
+      res.end(errorEvent(contentType, "Upstream stream ended unexpectedly"));
+    }
+  });
+  upstream.data.on("error", () => {});
+}
@@ -9,6 +9,8 @@ import dotenv from "dotenv";
 import axios from 'axios';
 import FormData from "form-data";
 import { GoogleGenerativeAI } from "@google/generative-ai";
+import { UploadStore } from "./uploadStore.js";
+import { fastapi, proxyStats, proxyStream } from "./fastapiProxy.js";
 
 dotenv.config();
 // Initialize Google Generative AI using only service account credentials
@@ -72,6 +74,66 @@ ${JSON.stringify(sections, null, 2)}
 }
 
 
+// Forwards main2.py --stream NDJSON events to the client as SSE. The final
+// "result" event is held back so deep search can refine it first.
+function streamSectionEvents(child, res, { persona, job, deepSearch, onDone }) {
+  res.setHeader("Content-Type", "text/event-stream");
+  res.setHeader("Cache-Control", "no-cache");
+  res.setHeader("Connection", "keep-alive");
+  res.flushHeaders();
+  const sendEvent = (event) => res.write(`data: ${JSON.stringify(event)}\n\n`);
+
+  let pending = "";
+  let stderr = "";
+  let result = null;
+  child.stdout.on("data", (d) => {
+    pending += d.toString();
+    let newline;
+    while ((newline = pending.indexOf("\n")) !== -1) {
+      const line = pending.slice(0, newline).trim();
+      pending = pending.slice(newline + 1);
+      // Skip anything that is not an event line (e.g. library warnings on stdout)
+      if (!line.startsWith("{")) continue;
+      let event;
+      try {
+        event = JSON.parse(line);
+      } catch {
+        continue;
+      }
+      if (event.event === "result") {
+        result = event;
+      } else {
+        sendEvent(event);
+      }
+    }
+  });
+  child.stderr.on("data", (d) => (stderr += d.toString()));
+
+  // Stop ranking if the client goes away
+  res.on("close", () => {
+    if (!res.writableEnded) child.kill("SIGKILL");
+  });
+
+  child.on("close", async (code) => {
+    onDone();
+    if (res.writableEnded || res.destroyed) return;
+    if (code !== 0 || !result) {
+      sendEvent({ event: "error", error: "Python process failed", code, stderr });
+      return res.end();
+    }
+    if (deepSearch === "true" && result.sections.length > 0) {
+      try {
+        result = { event: "result", sections: await refineSectionsWithGemini(result.sections, persona, job) };
+      } catch (geminiError) {
+        // Fallback to original sections if Gemini fails
+        console.error("Gemini refinement failed:", geminiError);
+      }
+    }
+    sendEvent(result);
+    res.end();
+  });
+}
+
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = path.dirname(__filename);
 
@@ -86,15 +148,17 @@ app.use(express.json());
 const uploadsDir = path.join(__dirname, "uploads");
 if (!fs.existsSync(uploadsDir)) fs.mkdirSync(uploadsDir, { recursive: true });
 
-const storage = multer.diskStorage({
-  destination: (_req, _file, cb) => cb(null, uploadsDir),
-  filename: (_req, file, cb) => {
-    const name = `${Date.now()}-${file.originalname.replace(/\s+/g, "_")}`;
-    cb(null, name);
-  },
-});
+// Uploads are stored once per unique content; each request gets its own alias
+const uploadStore = new UploadStore(uploadsDir);
+const storage = uploadStore.multerStorage(
+  (file) => `${Date.now()}-${file.originalname.replace(/\s+/g, "_")}`
+);
 const upload = multer({ storage });
 
+// Releases a request's uploads; blobs and their derived files go with the last alias
+const releaseUploads = (files) =>
+  files.forEach((file) => uploadStore.removeAlias(file.filename, file.sha256).catch(() => {}));
+
 const PYTHON_BIN = process.platform === "win32" ? "python" : "python3";
 
 app.get("/", (_req, res) => {
@@ -105,18 +169,24 @@ app.get("/api/health", (_req, res) => {
   res.json({ status: "ok" });
 });
 
+// Connection pool and stream counters for the FastAPI proxy
+app.get("/api/proxy-stats", (_req, res) => {
+  res.json(proxyStats());
+});
+
 app.post("/api/extract-headings", upload.single("pdf"), async (req, res) => {
   if (!req.file) return res.status(400).json({ error: "No file uploaded" });
 
   const pdfPath = req.file.path;
   const pdfFilename = req.file.filename;
+  const sha = req.file.sha256;
   const SCRIPT_PATH = path.join(__dirname, "python", "main1.py");
 
   const formData = new FormData();
   formData.append("file", fs.createReadStream(pdfPath));
 
   // Process for chat in the background
-  axios.post('http://localhost:8000/process-pdf/', formData, {
+  fastapi.post('/process-pdf/', formData, {
   headers: formData.getHeaders()},)
     .then(response => {
       console.log('PDF processing started:', response.data);
@@ -125,6 +195,12 @@ app.post("/api/extract-headings", upload.single("pdf"), async (req, res) => {
       console.error('Error starting PDF processing:', error.message);
     });
 
+  // Same bytes uploaded before: reuse its outline instead of running main1.py again
+  const cachedOutline = await uploadStore.readDerived(sha, "outline.json");
+  if (cachedOutline) {
+    return res.json({ ...JSON.parse(cachedOutline), pdfFilename });
+  }
+
   try {
     const child = spawn(PYTHON_BIN, [SCRIPT_PATH, pdfPath], {
       cwd: path.dirname(SCRIPT_PATH),
@@ -151,6 +227,7 @@ app.post("/api/extract-headings", upload.single("pdf"), async (req, res) => {
 
       try {
         const json = JSON.parse(stdout.trim());
+        uploadStore.writeDerived(sha, "outline.json", JSON.stringify(json)).catch(() => {});
         return res.json({ ...json, pdfFilename });
       } catch (e) {
         return res.status(500).json({ error: "Failed to parse Python output as JSON", detail: String(e), raw: stdout, stderr });
@@ -169,24 +246,8 @@ app.post("/api/chat-stream", async (req, res) => {
     return res.status(400).json({ error: "question is required" });
   }
 
-  try {
-    // Forward the request to the FastAPI streaming endpoint
-    const fastApiResponse = await axios.post('http://localhost:8000/chat-stream/', {
-      question,
-      pdfFilename
-    }, {
-      responseType: 'stream' // Important: handle the response as a stream
-    });
-
-    // Pipe the stream from FastAPI directly back to the client
-    res.setHeader('Content-Type', 'text/event-stream');
-    fastApiResponse.data.pipe(res);
-
-  } catch (error) {
-    // Log the detailed error on the server for debugging
-    console.error('Error proxying chat stream:', error.message);
-    res.status(500).json({ error: 'Error calling chat stream endpoint', detail: error.message });
-  }
+  // Pooled keep-alive connection; closing the client stream cancels the FastAPI generator
+  return proxyStream(res, '/chat-stream/', { question, pdfFilename }, { label: 'chat stream' });
 });
 
 app.post("/api/podcast-stream", async (req, res) => {
@@ -196,24 +257,8 @@ app.post("/api/podcast-stream", async (req, res) => {
     return res.status(400).json({ error: "question is required" });
   }
 
-  try {
-    // Forward the request to the FastAPI podcast streaming endpoint
-    const fastApiResponse = await axios.post('http://localhost:8000/podcast-stream/', {
-      question,
-      pdfFilename
-    }, {
-      responseType: 'stream' // Important: handle the response as a stream
-    });
-
-    // Pipe the stream from FastAPI directly back to the client
-    res.setHeader('Content-Type', 'text/event-stream');
-    fastApiResponse.data.pipe(res);
-
-  } catch (error) {
-    // Log the detailed error on the server for debugging
-    console.error('Error proxying podcast stream:', error.message);
-    res.status(500).json({ error: 'Error calling podcast stream endpoint', detail: error.message });
-  }
+  // Pooled keep-alive connection; closing the client stream cancels the FastAPI generator
+  return proxyStream(res, '/podcast-stream/', { question, pdfFilename }, { label: 'podcast stream' });
 });
 
 app.post("/api/insights-stream", async (req, res) => {
@@ -223,23 +268,23 @@ app.post("/api/insights-stream", async (req, res) => {
     return res.status(400).json({ error: "question is required" });
   }
 
-  try {
-    // Forward the request to the new FastAPI insights streaming endpoint
-    const fastApiResponse = await axios.post('http://localhost:8000/insights-stream/', {
-      question,
-      pdfFilename
-    }, {
-      responseType: 'stream'
-    });
+  // Pooled keep-alive connection; closing the client stream cancels the FastAPI generator
+  return proxyStream(res, '/insights-stream/', { question, pdfFilename }, { label: 'insights stream' });
+});
 
-    // Pipe the stream from FastAPI directly back to the client
-    res.setHeader('Content-Type', 'text/event-stream');
-    fastApiResponse.data.pipe(res);
+app.post("/api/chat-batch", async (req, res) => {
+  const { questions } = req.body;
+  const format = req.query.format === "ndjson" ? "ndjson" : "sse";
 
-  } catch (error) {
-    console.error('Error proxying insights stream:', error.message);
-    res.status(500).json({ error: 'Error calling insights stream endpoint', detail: error.message });
+  if (!Array.isArray(questions) || questions.length === 0) {
+    return res.status(400).json({ error: "questions must be a non-empty array" });
   }
+
+  // Forward the whole batch; FastAPI tags every event with its question id
+  return proxyStream(res, `/chat-batch/?format=${format}`, questions, {
+    contentType: format === "ndjson" ? 'application/x-ndjson' : 'text/event-stream',
+    label: 'chat batch',
+  });
 });
 
 
@@ -249,14 +294,17 @@ app.post("/api/extract-sections", upload.array("pdfs"), async (req, res) => {
     return res.status(400).json({ error: "No files uploaded" });
   }
 
-  const { persona, job, deepSearch } = req.body;
+  const { persona, job, deepSearch, stream } = req.body;
+  // stream=true: NDJSON progress from main2.py is forwarded as SSE
+  const streamMode = stream === "true" || req.query.stream === "true";
   if (!persona || !job) {
     return res.status(400).json({ error: "Persona and job are required" });
   }
 
+  // main2.py reads the blob, so its .html cache is shared by every copy of a document
   const uploadedFiles = req.files.map(file => ({
     file_name: file.originalname,
-    document_path: file.path
+    document_path: file.blobPath
   }));
 
   const inputData = {
@@ -272,11 +320,28 @@ app.post("/api/extract-sections", upload.array("pdfs"), async (req, res) => {
   const SCRIPT_PATH = path.join(__dirname, "python", "main2.py");
 
   try {
-    const child = spawn(PYTHON_BIN, [SCRIPT_PATH, inputJsonPath], {
+    const args = streamMode ? [SCRIPT_PATH, inputJsonPath, "--stream"] : [SCRIPT_PATH, inputJsonPath];
+    const child = spawn(PYTHON_BIN, args, {
       cwd: path.dirname(SCRIPT_PATH),
       stdio: ["ignore", "pipe", "pipe"],
     });
 
+    if (streamMode) {
+      const timeout = setTimeout(() => {
+        child.kill("SIGKILL");
+      }, Number(process.env.EXTRACT_TIMEOUT_MS || 120000));
+      return streamSectionEvents(child, res, {
+        persona,
+        job,
+        deepSearch,
+        onDone: () => {
+          clearTimeout(timeout);
+          releaseUploads(req.files);
+          fs.unlink(inputJsonPath, () => {});
+        },
+      });
+    }
+
     let stdout = "";
     let stderr = "";
 
@@ -290,7 +355,7 @@ app.post("/api/extract-sections", upload.array("pdfs"), async (req, res) => {
 
     child.on("close", async (code) => {
       clearTimeout(timeout);
-      uploadedFiles.forEach(file => fs.unlink(file.document_path, () => {}));
+      releaseUploads(req.files);
       fs.unlink(inputJsonPath, () => {});
 
       if (code !== 0) {
@@ -319,7 +384,7 @@ app.post("/api/extract-sections", upload.array("pdfs"), async (req, res) => {
     });
   } catch (err) {
     console.log("in catch1");
-    uploadedFiles.forEach(file => fs.unlink(file.document_path, () => {}));
+    releaseUploads(req.files);
     fs.unlink(inputJsonPath, () => {});
     return res.status(500).json({ error: "Server error", detail: String(err) });
   }
@@ -0,0 +1,180 @@
+import os
+import math
+import time
+import heapq
+import asyncio
+import itertools
+from typing import Dict, List, Optional
+
+from instrumentation import Histogram
+
+# -------------------------------
+
+# Configuration
+# -------------------------------
+
+# Upstream (Gemini / Azure TTS) calls allowed to run at once across all endpoints.
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# Requests allowed to wait for a slot; beyond this they are rejected at once.
+MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+# Longest a queued request waits before it is rejected.
+MAX_WAIT_S = float(os.getenv("LLM_MAX_WAIT_S", "10"))
+
+# Lower value is served first. Interactive chat beats the long podcast/TTS jobs,
+# and bulk /chat-batch/ questions yield to everything else.
+ENDPOINT_PRIORITIES = {
+    "chat": 0,
+    "insights": 1,
+    "podcast": 2,
+    "tts": 2,
+    "batch": 3,
+}
+
+WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# -------------------------------
+
+# Admission control
+# -------------------------------
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot get a slot in time; maps to HTTP 429."""
+
+    def __init__(self, endpoint: str, reason: str, retry_after: int):
+        super().__init__(f"{endpoint} request rejected: {reason}")
+        self.endpoint = endpoint
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """A granted slot. release() is idempotent so every exit path may call it."""
+
+    def __init__(self, controller: "AdmissionController"):
+        self._controller = controller
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._controller._release()
+
+
+class AdmissionController:
+    """
+    Concurrency limiter with a bounded, prioritised wait queue.
+
+    Requests get a slot immediately while fewer than max_concurrency are
+    running. Otherwise they queue by endpoint priority (FIFO within a
+    priority), and are rejected straight away when the queue is full or
+    after max_wait_s if no slot frees up.
+    """
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY, max_queue: int = MAX_QUEUE,
+                 max_wait_s: float = MAX_WAIT_S, priorities: Optional[Dict[str, int]] = None):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait_s = max_wait_s
+        self.priorities = priorities or ENDPOINT_PRIORITIES
+        self.active = 0
+        self._waiters: List = []
+        self._seq = itertools.count()
+        self.admitted: Dict[str, int] = {}
+        self.rejected: Dict[str, int] = {}
+        self.wait_seconds = Histogram("admission_wait_seconds", "Time spent queued for an admission slot.", WAIT_BUCKETS)
+
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, future, _ in self._waiters if not future.done())
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self.max_wait_s))
+
+    def _reject(self, endpoint: str, reason: str):
+        self.rejected[endpoint] = self.rejected.get(endpoint, 0) + 1
+        raise AdmissionRejected(endpoint, reason, self._retry_after())
+
+    def _record_wait(self, endpoint: str, seconds: float):
+        self.admitted[endpoint] = self.admitted.get(endpoint, 0) + 1
+        self.wait_seconds.observe(seconds, endpoint=endpoint)
+
+    async def acquire(self, endpoint: str) -> Ticket:
+        start = time.perf_counter()
+        if self.active < self.max_concurrency and not self.queue_depth():
+            self.active += 1
+            self._record_wait(endpoint, 0.0)
+            return Ticket(self)
+        priority = self.priorities.get(endpoint, 1)
+        if self.queue_depth() >= self.max_queue and not self._evict_lower_priority(priority):
+            self._reject(endpoint, "queue full")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future, endpoint))
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.max_wait_s)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # Granted in the same tick the timeout fired; keep the slot.
+                self._record_wait(endpoint, time.perf_counter() - start)
+                return Ticket(self)
+            future.cancel()
+            self._reject(endpoint, "timed out waiting for a slot")
+        except asyncio.CancelledError:
+            # Client went away while queued; hand back a slot granted meanwhile.
+            if future.done() and not future.cancelled():
+                self._release()
+            future.cancel()
+            raise
+        self._record_wait(endpoint, time.perf_counter() - start)
+        return Ticket(self)
+
+    def _evict_lower_priority(self, priority: int) -> bool:
+        """Makes room in a full queue by rejecting the newest waiter of a lower priority."""
+        candidates = [w for w in self._waiters if not w[2].done() and w[0] > priority]
+        if not candidates:
+            return False
+        victim_priority, _, future, victim = max(candidates, key=lambda w: (w[0], w[1]))
+        self.rejected[victim] = self.rejected.get(victim, 0) + 1
+        future.set_exception(AdmissionRejected(victim, "displaced by higher-priority request", self._retry_after()))
+        return True
+
+    def _release(self):
+        while self._waiters:
+            _, _, future, _ = heapq.heappop(self._waiters)
+            if not future.done():
+                # The slot passes straight to the next waiter; active is unchanged.
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "queue_depth": self.queue_depth(),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "admitted": dict(self.admitted),
+            "rejected": dict(self.rejected),
+        }
+
+    def prometheus_lines(self) -> List[str]:
+        """Queue depth, concurrency, counters and a wait-time histogram in Prometheus text format."""
+        lines = [
+            "# TYPE admission_active gauge",
+            f"admission_active {self.active}",
+            "# TYPE admission_queue_depth gauge",
+            f"admission_queue_depth {self.queue_depth()}",
+            "# TYPE admission_admitted_total counter",
+        ]
+        lines += [f'admission_admitted_total{{endpoint="{e}"}} {n}' for e, n in sorted(self.admitted.items())]
+        lines.append("# TYPE admission_rejected_total counter")
+        lines += [f'admission_rejected_total{{endpoint="{e}"}} {n}' for e, n in sorted(self.rejected.items())]
+        return lines + self.wait_seconds.prometheus_lines()
+
+
+async def release_when_done(events, ticket: Ticket):
+    """Wraps an SSE generator so its admission slot is released however it ends."""
+    try:
+        async for event in events:
+            yield event
+    finally:
+        ticket.release()
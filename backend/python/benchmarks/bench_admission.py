@@ -0,0 +1,75 @@
+"""
+Spike test for the admission controller used by fastapi_app.py, against a
+fake streaming upstream.
+
+Fires --requests chat/podcast requests at once (--chat-share of them chat)
+and reports, per endpoint, how many were served or got 429, their wait
+for a slot, and the peak number of concurrent upstream streams.
+
+    python benchmarks/bench_admission.py --requests 200 --concurrency 8 --queue 32
+"""
+import json
+import time
+import random
+import asyncio
+import argparse
+
+from common import latency_summary
+from fake_llm import FakeStreamingLLM
+from admission import AdmissionController, AdmissionRejected
+from llm_singleflight import stream_llm_text
+
+
+async def run_spike(args):
+    llm = FakeStreamingLLM(chunks=20, ttft=0.3, token_delay=0.02)
+    controller = AdmissionController(args.concurrency, args.queue, args.max_wait)
+    waits = {"chat": [], "podcast": []}
+    rejected = {"chat": 0, "podcast": 0}
+    peak = 0
+    rng = random.Random(0)
+    endpoints = ["chat" if rng.random() < args.chat_share else "podcast" for _ in range(args.requests)]
+
+    async def request(n):
+        nonlocal peak
+        endpoint = endpoints[n]
+        start = time.perf_counter()
+        try:
+            ticket = await controller.acquire(endpoint)
+        except AdmissionRejected:
+            rejected[endpoint] += 1
+            return
+        waits[endpoint].append((time.perf_counter() - start) * 1000)
+        try:
+            async for _ in stream_llm_text(llm, f"prompt {n}"):
+                peak = max(peak, llm.active)
+        finally:
+            ticket.release()
+
+    await asyncio.gather(*(request(n) for n in range(args.requests)))
+    results = []
+    for endpoint in ("chat", "podcast"):
+        results.append({
+            "endpoint": endpoint,
+            "served": len(waits[endpoint]),
+            "rejected_429": rejected[endpoint],
+            **(latency_summary(waits[endpoint], "wait") if waits[endpoint] else {}),
+        })
+    results.append({"peak_upstream_streams": peak, "limit": args.concurrency,
+                    "leaked_slots": controller.active})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Admission control under a request spike")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--chat-share", type=float, default=0.5)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--queue", type=int, default=32)
+    parser.add_argument("--max-wait", type=float, default=5.0)
+    args = parser.parse_args()
+    for r in asyncio.run(run_spike(args)):
+        print(json.dumps(r))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Compare the FAISS index types from vector_index.py on synthetic vectors.
+
+For every corpus size and index type this reports recall@3 against exact
+search, per-query latency (p50/p99, single-query as the app issues them),
+build/training time and the memory held by the index.
+
+    python benchmarks/bench_ann_index.py --sizes 10000,100000,1000000
+"""
+import time
+import json
+import argparse
+import resource
+
+import numpy as np
+import faiss
+
+import common  # noqa: F401  (puts backend/python on sys.path)
+import vector_index
+
+DIM = 384  # all-MiniLM-L6-v2
+
+
+def rss_mb():
+    """Current resident set size in MB (falls back to peak RSS off Linux)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def synthetic_vectors(n, dim, n_clusters=256, seed=0):
+    """Clustered, L2-normalised vectors; uniform noise makes every ANN index look bad."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim)).astype(np.float32)
+    out = np.empty((n, dim), dtype=np.float32)
+    step = 100000
+    for start in range(0, n, step):
+        stop = min(start + step, n)
+        labels = rng.integers(0, n_clusters, stop - start)
+        out[start:stop] = centers[labels] + 0.35 * rng.normal(size=(stop - start, dim)).astype(np.float32)
+    faiss.normalize_L2(out)
+    return out
+
+
+def recall_at_k(found, truth, k):
+    hits = sum(len(set(f[:k]) & set(t[:k])) for f, t in zip(found, truth))
+    return hits / (len(truth) * k)
+
+
+def bench_one(index_type, corpus, queries, truth, k):
+    rss_before = rss_mb()
+    t0 = time.perf_counter()
+    # Force the configured type regardless of TRAIN_MIN_VECTORS.
+    vector_index.TRAIN_MIN_VECTORS = 0
+    index = vector_index.create_index(index_type, corpus.shape[1], corpus)
+    train_s = time.perf_counter() - t0
+    index.add(corpus)
+    build_s = time.perf_counter() - t0
+    rss_after = rss_mb()
+
+    latencies = []
+    found = []
+    for q in queries:
+        s = time.perf_counter()
+        _, ids = index.search(q.reshape(1, -1), k)
+        latencies.append((time.perf_counter() - s) * 1000)
+        found.append(ids[0])
+
+    result = {
+        "index_type": index_type,
+        "factory": vector_index.index_factory_string(index_type, corpus.shape[1], len(corpus)),
+        "n": len(corpus),
+        f"recall@{k}": round(recall_at_k(found, truth, k), 4),
+        "latency_p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "latency_p99_ms": round(float(np.percentile(latencies, 99)), 3),
+        "train_s": round(train_s, 2),
+        "build_s": round(build_s, 2),
+        "index_mb": round(faiss.serialize_index(index).nbytes / 2**20, 1),
+        "rss_delta_mb": round(rss_after - rss_before, 1),
+    }
+    del index
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FAISS index types on synthetic vectors")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--types", default=",".join(vector_index.INDEX_TYPES))
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("-k", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=1, help="FAISS OpenMP threads (the app searches one query at a time)")
+    parser.add_argument("--out", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    faiss.omp_set_num_threads(args.threads)
+    results = []
+    for n in (int(s) for s in args.sizes.split(",")):
+        corpus = synthetic_vectors(n, DIM, seed=0)
+        queries = synthetic_vectors(args.queries, DIM, seed=1)
+        exact = faiss.IndexFlatL2(DIM)
+        exact.add(corpus)
+        _, truth = exact.search(queries, args.k)
+        del exact
+        for index_type in args.types.split(","):
+            r = bench_one(index_type, corpus, queries, truth, args.k)
+            results.append(r)
+            print(json.dumps(r))
+        del corpus
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
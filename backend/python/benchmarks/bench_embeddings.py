@@ -0,0 +1,93 @@
+"""
+Compare embedding backends from embedding_backend.py against the torch
+baseline (the vectors the existing FAISS index was built with).
+
+Reports ingestion throughput (chunks/s through embed_documents), single
+query latency (p50/p99), concurrent query throughput through the query
+batcher, and cosine agreement with the baseline vectors.
+
+    python benchmarks/bench_embeddings.py --backends torch,torch-int8,onnx,onnx-int8 --threads 4
+"""
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from common import latency_summary, load_chunks
+import embedding_backend
+
+
+def cosine_rows(a, b):
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+def bench_backend(backend, chunks, queries, threads, concurrency):
+    t0 = time.perf_counter()
+    emb = embedding_backend.get_embeddings(backend, threads=threads)
+    load_s = time.perf_counter() - t0
+
+    emb.embed_documents(chunks[:8])  # warm-up
+    t0 = time.perf_counter()
+    doc_vectors = np.asarray(emb.embed_documents(chunks), dtype=np.float32)
+    ingest_s = time.perf_counter() - t0
+
+    latencies = []
+    query_vectors = []
+    for q in queries:
+        s = time.perf_counter()
+        query_vectors.append(emb.embed_query(q))
+        latencies.append((time.perf_counter() - s) * 1000)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(emb.embed_query, queries))
+    concurrent_s = time.perf_counter() - t0
+
+    return {
+        "backend": backend,
+        "load_s": round(load_s, 2),
+        "ingest_chunks_per_s": round(len(chunks) / ingest_s, 1),
+        **latency_summary(latencies, "query"),
+        f"concurrent_queries_per_s@{concurrency}": round(len(queries) / concurrent_s, 1),
+    }, doc_vectors, np.asarray(query_vectors, dtype=np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends")
+    parser.add_argument("--backends", default=",".join(embedding_backend.EMBEDDING_BACKENDS))
+    parser.add_argument("--chunks", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=embedding_backend.EMBEDDING_THREADS)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--out", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    chunks = load_chunks(args.chunks)
+    queries = [c[:200] for c in chunks[:args.queries]]
+
+    results = []
+    baseline = None
+    for backend in args.backends.split(","):
+        result, docs, qs = bench_backend(backend, chunks, queries, args.threads, args.concurrency)
+        if baseline is None:
+            baseline = (backend, docs, qs)
+        cos = np.concatenate([cosine_rows(docs, baseline[1]), cosine_rows(qs, baseline[2])])
+        result.update({
+            "cosine_vs": baseline[0],
+            "cosine_mean": round(float(cos.mean()), 5),
+            "cosine_min": round(float(cos.min()), 5),
+        })
+        results.append(result)
+        print(json.dumps(result))
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Load test for the Node gateway's FastAPI proxy (fastapiProxy.js).
+
+Starts stub_servers.py, fastapi_app (via serve_app.py) and `node index.js`
+pointed at it, ingests one sample PDF, then sends --requests concurrent
+/api/chat-stream requests through the gateway. --abort-fraction of the
+clients hang up after the first chunk, the way a user closing the chat
+panel does. Each --modes entry restarts the gateway:
+
+  pooled        shared keep-alive agent (the default)
+  no-keepalive  FASTAPI_KEEPALIVE=0, a new TCP connection per request
+  direct        no gateway; the same load straight at FastAPI, as a floor
+
+After the load settles it checks nothing leaked: the gateway reports no
+open proxied streams, FastAPI holds no admission slots and the stub LLM
+has no streams left open. Every aborted client should show up as one
+cancelled stub LLM stream. Needs `npm install` in backend/.
+
+    python benchmarks/bench_gateway.py --requests 200 --concurrency 50 --abort-fraction 0.25
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+import httpx
+
+from common import PYTHON_DIR, latency_summary, sample_pdfs
+from bench_pipeline import free_port, start_servers, wait_until_up
+
+BACKEND_DIR = os.path.abspath(os.path.join(PYTHON_DIR, ".."))
+
+
+def start_gateway(fastapi_url, keepalive, max_sockets):
+    port = free_port()
+    env = dict(os.environ)
+    env.update({
+        "PORT": str(port),
+        "FASTAPI_URL": fastapi_url,
+        "FASTAPI_KEEPALIVE": "1" if keepalive else "0",
+        "FASTAPI_MAX_SOCKETS": str(max_sockets),
+    })
+    process = subprocess.Popen(["node", "index.js"], cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL)
+    return process, f"http://127.0.0.1:{port}"
+
+
+async def wait_for_gateway(client, timeout_s=30):
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/api/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("node gateway did not start")
+
+
+def prometheus_value(metrics_text, name):
+    for line in metrics_text.splitlines():
+        if line.startswith(name + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+async def run_load(client, path, requests, concurrency, abort_fraction):
+    semaphore = asyncio.Semaphore(concurrency)
+    abort_every = round(1 / abort_fraction) if abort_fraction else 0
+    ttfb, total, statuses = [], [], {}
+    aborted = 0
+
+    async def one(i):
+        nonlocal aborted
+        abort = abort_every and i % abort_every == 0
+        async with semaphore:
+            start = time.perf_counter()
+            # Distinct questions so every request has its own upstream LLM stream.
+            body = {"question": f"What should a traveller know about cuisine and culture? ({i})"}
+            first = True
+            async with client.stream("POST", path, json=body) as response:
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                async for _ in response.aiter_raw():
+                    if first:
+                        ttfb.append((time.perf_counter() - start) * 1000)
+                        first = False
+                    if abort:
+                        # Leaving the block closes the connection mid-stream.
+                        aborted += 1
+                        return
+            total.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    r = {"requests": requests, "concurrency": concurrency, "aborted": aborted, "statuses": statuses,
+         "requests_per_s": round(requests / elapsed, 2)}
+    if ttfb:
+        r.update(latency_summary(ttfb, "ttfb"))
+    if total:
+        r.update(latency_summary(total, "total"))
+    return r
+
+
+async def bench_mode(mode, app_client, stub_url, fastapi_url, args):
+    gateway = None
+    try:
+        if mode == "direct":
+            base_url, path = fastapi_url, "/chat-stream/"
+        else:
+            gateway, base_url = start_gateway(fastapi_url, mode == "pooled", args.max_sockets)
+            path = "/api/chat-stream"
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+            if gateway is not None:
+                await wait_for_gateway(client)
+            async with httpx.AsyncClient(timeout=30) as stub_client:
+                before = (await stub_client.get(f"{stub_url}/stats")).json()
+                r = await run_load(client, path, args.requests, args.concurrency, args.abort_fraction)
+                # Give cancellations time to travel gateway -> FastAPI -> stub LLM.
+                await asyncio.sleep(args.settle_s)
+                after = (await stub_client.get(f"{stub_url}/stats")).json()
+            metrics = (await app_client.get("/metrics")).text
+            r.update({
+                "llm_calls": after["llm"] - before["llm"],
+                "llm_cancelled": after["llm_cancelled"] - before["llm_cancelled"],
+                "llm_open_after": after["llm_open"],
+                "admission_active_after": prometheus_value(metrics, "admission_active"),
+            })
+            if gateway is not None:
+                proxy = (await client.get("/api/proxy-stats")).json()
+                r.update({
+                    "upstream_sockets_created": proxy["socketsCreated"],
+                    "proxy_streams_open_after": proxy["streamsOpen"],
+                    "proxy_client_aborts": proxy["clientAborts"],
+                    "proxy_upstream_errors": proxy["upstreamErrors"],
+                })
+        r["leaked_streams"] = (r["llm_open_after"] + (r["admission_active_after"] or 0)
+                               + r.get("proxy_streams_open_after", 0))
+        print(json.dumps({"mode": mode, **r}))
+        return r
+    finally:
+        if gateway is not None:
+            gateway.terminate()
+            gateway.wait()
+
+
+async def run(args, workdir):
+    processes, fastapi_url, stub_url = start_servers(workdir, args)
+    try:
+        async with httpx.AsyncClient(base_url=fastapi_url, timeout=300) as app_client:
+            await wait_until_up(app_client)
+            pdf = sample_pdfs()[0]
+            with open(pdf, "rb") as f:
+                response = await app_client.post("/process-pdf/", files={"file": (os.path.basename(pdf), f.read(), "application/pdf")})
+            response.raise_for_status()
+            return {mode: await bench_mode(mode, app_client, stub_url, fastapi_url, args) for mode in args.modes.split(",")}
+    finally:
+        for p in processes:
+            p.terminate()
+        for p in processes:
+            p.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Node -> FastAPI streaming proxy")
+    parser.add_argument("--modes", default="pooled,no-keepalive,direct")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--abort-fraction", type=float, default=0.25,
+                        help="Share of clients that disconnect after the first chunk")
+    parser.add_argument("--max-sockets", type=int, default=64, help="FASTAPI_MAX_SOCKETS for the gateway")
+    parser.add_argument("--settle-s", type=float, default=2.0)
+    parser.add_argument("--llm-ttft-ms", type=float, default=300.0)
+    parser.add_argument("--llm-token-ms", type=float, default=20.0)
+    parser.add_argument("--llm-tokens", type=int, default=40)
+    parser.add_argument("--out", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    if args.modes != "direct" and not os.path.isdir(os.path.join(BACKEND_DIR, "node_modules")):
+        sys.exit("Run `npm install` in backend/ first (or use --modes direct)")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = asyncio.run(run(args, workdir))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+"""
+End-to-end pipeline benchmark. Use it to compare a change to main1/main2
+or to FAISS ingestion before and after.
+
+Inputs are synthetic PDFs (every combination of --pages and
+--heading-density, with a fixed seed) plus the sample PDFs in
+backend/uploads. Everything runs from a copy in a temp dir, so main2's
+.html caches and the FAISS index never touch the real ones. Timed phases:
+
+  main1     outline extraction (`python main1.py <pdf>`, as index.js runs it)
+  main2     section ranking (`python main2.py <input.json>`, with a cold .html cache)
+  ingest    POST /process-pdf/ on fastapi_app
+  chat      /chat-stream/ time to first byte and to the first answer token
+
+For ingest and chat the app runs via serve_app.py against stub_servers.py,
+which stands in for Gemini and Azure TTS. main1/main2 timings include the
+per-stage block the scripts print to stderr. Results are written as JSON.
+--baseline prints the change relative to an earlier results file.
+
+    python benchmarks/bench_pipeline.py --pages 5,20,50 --heading-density 1,4 --out results.json
+    python benchmarks/bench_pipeline.py --out new.json --baseline results.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import asyncio
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+
+import httpx
+
+from common import PYTHON_DIR, latency_summary, sample_pdfs
+from synthetic_pdf import generate_pdf
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PERSONA = "Travel Planner"
+JOB = "Plan a four day trip for a group of friends covering cuisine, culture and nightlife"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=PYTHON_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def timing_block(stderr):
+    """The {"timing": ...} line main1.py / main2.py print last on stderr."""
+    for line in reversed(stderr.splitlines()):
+        if line.startswith('{"timing"'):
+            return json.loads(line)["timing"]
+    return {}
+
+
+def script_json(stdout):
+    # Newer PyMuPDF releases print a deprecation warning for "import fitz" to stdout.
+    return json.loads(stdout[stdout.index("{"):])
+
+
+def summarize(wall_ms, stage_runs):
+    out = {"runs": len(wall_ms), "wall_mean_ms": round(statistics.mean(wall_ms), 2),
+           "wall_min_ms": round(min(wall_ms), 2), **latency_summary(wall_ms, "wall")}
+    stages = {}
+    for timing in stage_runs:
+        for stage, s in timing.items():
+            stages.setdefault(stage, []).append(s["total_s"] * 1000)
+    out["stages_mean_ms"] = {stage: round(statistics.mean(v), 2) for stage, v in stages.items()}
+    return out
+
+
+def prepare_inputs(workdir, pages_list, densities, seed, with_samples):
+    """Returns [(label, pdf_path, meta)] with every PDF copied or generated into workdir."""
+    pdf_dir = os.path.join(workdir, "pdfs")
+    os.makedirs(pdf_dir)
+    inputs = []
+    for pages in pages_list:
+        for density in densities:
+            label = f"synthetic-{pages}p-{density}h"
+            path = os.path.join(pdf_dir, label + ".pdf")
+            headings = generate_pdf(path, pages, density, seed)
+            inputs.append((label, path, {"pages": pages, "headings_per_page": density, "headings": headings}))
+    if with_samples:
+        for src in sample_pdfs():
+            name = os.path.basename(src).split("-", 1)[-1]
+            path = os.path.join(pdf_dir, name)
+            shutil.copy(src, path)
+            inputs.append((f"sample-{name}", path, {"sample": True}))
+    return inputs
+
+
+def run_script(args):
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable] + args, cwd=PYTHON_DIR, capture_output=True, text=True)
+    elapsed = (time.perf_counter() - start) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(f"{args[0]} failed ({proc.returncode}): {proc.stderr[-500:]}")
+    return elapsed, proc.stdout, timing_block(proc.stderr)
+
+
+def bench_main1(inputs, repeats):
+    results = []
+    for label, path, meta in inputs:
+        wall, stages = [], []
+        for _ in range(repeats):
+            elapsed, stdout, timing = run_script(["main1.py", path])
+            wall.append(elapsed)
+            stages.append(timing)
+        outline = script_json(stdout)["outline"]
+        r = {"input": label, **meta, "outline_entries": len(outline), **summarize(wall, stages)}
+        results.append(r)
+        print(json.dumps({"phase": "main1", **r}))
+    return results
+
+
+def bench_main2(inputs, repeats, workdir):
+    # Each synthetic PDF alone, then all sample PDFs as one collection (the usual request).
+    groups = [(label, [(label, path)], meta) for label, path, meta in inputs if not meta.get("sample")]
+    samples = [(label, path) for label, path, meta in inputs if meta.get("sample")]
+    if samples:
+        groups.append(("sample-collection", samples, {"documents": len(samples)}))
+
+    results = []
+    for label, docs, meta in groups:
+        input_file = os.path.join(workdir, f"{label}.json")
+        with open(input_file, "w") as f:
+            json.dump({
+                "documents": [{"document_path": path, "file_name": os.path.basename(path)} for _, path in docs],
+                "persona": PERSONA,
+                "job_to_be_done": JOB,
+            }, f)
+        wall, stages = [], []
+        for _ in range(repeats):
+            # main2 caches <pdf>.html next to the PDF; drop it so parsing is timed every run.
+            for _, path in docs:
+                html = path.replace(".pdf", "") + ".html"
+                if os.path.exists(html):
+                    os.remove(html)
+            elapsed, stdout, timing = run_script(["main2.py", input_file])
+            wall.append(elapsed)
+            stages.append(timing)
+        r = {"input": label, **meta, "sections": len(script_json(stdout)["sections"]), **summarize(wall, stages)}
+        results.append(r)
+        print(json.dumps({"phase": "main2", **r}))
+    return results
+
+
+def start_servers(workdir, args):
+    stub_port, app_port = free_port(), free_port()
+    stub = subprocess.Popen([
+        sys.executable, os.path.join(BENCH_DIR, "stub_servers.py"), "--port", str(stub_port),
+        "--ttft-ms", str(args.llm_ttft_ms), "--token-ms", str(args.llm_token_ms), "--tokens", str(args.llm_tokens),
+    ])
+    env = dict(os.environ)
+    env.update({
+        "UPLOAD_DIR": os.path.join(workdir, "uploads"),
+        "FAISS_CACHE_DIR": os.path.join(workdir, "faiss_cache"),
+        "AZURE_TTS_ENDPOINT": f"http://127.0.0.1:{stub_port}",
+        "AZURE_TTS_DEPLOYMENT": "stub",
+        "AZURE_TTS_KEY": "stub",
+    })
+    env.pop("GOOGLE_APPLICATION_CREDENTIALS", None)
+    os.makedirs(env["UPLOAD_DIR"])
+    app = subprocess.Popen([
+        sys.executable, os.path.join(BENCH_DIR, "serve_app.py"), "--port", str(app_port),
+        "--llm-url", f"http://127.0.0.1:{stub_port}",
+    ], cwd=workdir, env=env)
+    return [stub, app], f"http://127.0.0.1:{app_port}", f"http://127.0.0.1:{stub_port}"
+
+
+async def wait_until_up(client, timeout_s=300):
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/metrics")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.5)
+    raise RuntimeError("fastapi_app did not start")
+
+
+async def bench_ingest(client, inputs):
+    results = []
+    for label, path, meta in inputs:
+        with open(path, "rb") as f:
+            pdf_bytes = f.read()
+        start = time.perf_counter()
+        response = await client.post("/process-pdf/", files={"file": (os.path.basename(path), pdf_bytes, "application/pdf")})
+        elapsed = (time.perf_counter() - start) * 1000
+        response.raise_for_status()
+        r = {"input": label, **meta, "bytes": len(pdf_bytes), "elapsed_ms": round(elapsed, 2)}
+        results.append(r)
+        print(json.dumps({"phase": "ingest", **r}))
+    return results
+
+
+async def bench_chat(client, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    ttfb, first_token, total, statuses = [], [], [], {}
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            # Distinct questions so shared streams do not hide upstream latency.
+            body = {"question": f"What should a traveller know about cuisine and culture? ({i})"}
+            async with client.stream("POST", "/chat-stream/", json=body) as response:
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                seen_first_byte = seen_token = False
+                async for chunk in response.aiter_text():
+                    now = (time.perf_counter() - start) * 1000
+                    if not seen_first_byte:
+                        ttfb.append(now)
+                        seen_first_byte = True
+                    if not seen_token and "output_text" in chunk:
+                        first_token.append(now)
+                        seen_token = True
+            total.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    r = {"requests": requests, "concurrency": concurrency, "statuses": statuses,
+         "requests_per_s": round(requests / elapsed, 2), **latency_summary(total, "total")}
+    if ttfb:
+        r.update(latency_summary(ttfb, "ttfb"))
+    if first_token:
+        r.update(latency_summary(first_token, "first_token"))
+    print(json.dumps({"phase": "chat", **r}))
+    return r
+
+
+def server_stages(metrics_text):
+    """Mean ms per stage from the app's stage_duration_seconds histogram."""
+    sums, counts = {}, {}
+    for line in metrics_text.splitlines():
+        if line.startswith(("stage_duration_seconds_sum", "stage_duration_seconds_count")):
+            name, value = line.rsplit(" ", 1)
+            labels = name[name.index("{") + 1:-1]
+            target = sums if name.startswith("stage_duration_seconds_sum") else counts
+            target[labels] = float(value)
+    return {labels: round(sums[labels] / counts[labels] * 1000, 2) for labels in sums if counts.get(labels)}
+
+
+async def bench_server(inputs, workdir, args):
+    processes, base_url, _ = start_servers(workdir, args)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=300) as client:
+            await wait_until_up(client)
+            ingest = await bench_ingest(client, inputs)
+            chat = await bench_chat(client, args.chat_requests, args.chat_concurrency)
+            stages = server_stages((await client.get("/metrics")).text)
+        return {"ingest": ingest, "chat": chat, "server_stages_mean_ms": stages}
+    finally:
+        for p in processes:
+            p.terminate()
+        for p in processes:
+            p.wait()
+
+
+def flatten(results):
+    """{"main1/synthetic-5p-1h/wall_mean_ms": 12.3, ...} for every timing in a results file."""
+    flat = {}
+    for phase in ("main1", "main2", "ingest"):
+        for r in results.get(phase, []):
+            for key, value in r.items():
+                if key.endswith("_ms") and isinstance(value, (int, float)):
+                    flat[f"{phase}/{r['input']}/{key}"] = value
+    for key, value in results.get("chat", {}).items():
+        if key.endswith("_ms"):
+            flat[f"chat/{key}"] = value
+    return flat
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        before = flatten(json.load(f))
+    after = flatten(results)
+    for key in sorted(after.keys() & before.keys()):
+        if before[key]:
+            change = (after[key] - before[key]) / before[key] * 100
+            print(f"{key:70s} {before[key]:10.2f} -> {after[key]:10.2f} ms  {change:+6.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark main1, main2, ingestion and chat TTFB")
+    parser.add_argument("--pages", default="5,20,50", help="Synthetic PDF page counts")
+    parser.add_argument("--heading-density", default="1,4", help="Synthetic headings per page")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-samples", action="store_true", help="Skip the PDFs in backend/uploads")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per main1/main2 input")
+    parser.add_argument("--phases", default="main1,main2,server", help="Any of main1, main2, server")
+    parser.add_argument("--chat-requests", type=int, default=20)
+    parser.add_argument("--chat-concurrency", type=int, default=4)
+    parser.add_argument("--llm-ttft-ms", type=float, default=300.0)
+    parser.add_argument("--llm-token-ms", type=float, default=20.0)
+    parser.add_argument("--llm-tokens", type=int, default=40)
+    parser.add_argument("--out", default="pipeline_results.json")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    phases = set(args.phases.split(","))
+    results = {
+        "meta": {
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "args": vars(args),
+            "env": {k: v for k, v in os.environ.items()
+                    if k.startswith(("EMBEDDING_", "FAISS_", "RETRIEVAL_", "LLM_"))},
+        }
+    }
+    main1_html = os.path.join(PYTHON_DIR, "output.html")
+    had_main1_html = os.path.exists(main1_html)
+    with tempfile.TemporaryDirectory() as workdir:
+        inputs = prepare_inputs(workdir, [int(p) for p in args.pages.split(",")],
+                                [int(d) for d in args.heading_density.split(",")], args.seed, not args.no_samples)
+        if "main1" in phases:
+            results["main1"] = bench_main1(inputs, args.repeats)
+        if "main2" in phases:
+            results["main2"] = bench_main2(inputs, args.repeats, workdir)
+        if "server" in phases:
+            results.update(asyncio.run(bench_server(inputs, workdir, args)))
+    # main1.py always writes output.html next to itself.
+    if not had_main1_html and os.path.exists(main1_html):
+        os.remove(main1_html)
+
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=4)
+    print(f"Wrote {args.out}")
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
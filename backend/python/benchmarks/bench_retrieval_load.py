@@ -0,0 +1,78 @@
+"""
+Concurrent load test for retrieval: per-request similarity_search versus
+the RetrievalCoalescer used by fastapi_app.py.
+
+Each of --clients asyncio tasks issues --requests searches back to back,
+as concurrent SSE generators do. Reports throughput and p50/p99 latency.
+
+    python benchmarks/bench_retrieval_load.py --clients 1,10,50 --requests 20
+"""
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+
+from common import latency_summary, load_chunks
+import embedding_backend
+import vector_index
+from retrieval_batcher import RetrievalCoalescer
+
+
+def build_vector_store(embeddings, chunks, cache_dir):
+    chunk_store = vector_index.open_chunk_store(cache_dir)
+    return vector_index.add_chunks_to_vector_store(None, embeddings, chunk_store, chunks)
+
+
+async def run_load(search, queries, clients, requests_per_client):
+    latencies = []
+
+    async def client(offset):
+        for i in range(requests_per_client):
+            query = queries[(offset + i) % len(queries)]
+            start = time.perf_counter()
+            await search(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(c * requests_per_client) for c in range(clients)))
+    elapsed = time.perf_counter() - start
+    return {"requests_per_s": round(len(latencies) / elapsed, 1), **latency_summary(latencies)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test per-request vs coalesced retrieval")
+    parser.add_argument("--clients", default="1,10,50")
+    parser.add_argument("--requests", type=int, default=20, help="Searches per client")
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--window-ms", type=float, default=3.0)
+    parser.add_argument("--out", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    # The app's own query batcher is disabled so the per-request mode really
+    # is one forward pass per request, as before the coalescer.
+    embeddings = embedding_backend.get_embeddings(batch_queries=False)
+    chunks = load_chunks(args.chunks)
+    queries = [c[:200] for c in chunks]
+    with tempfile.TemporaryDirectory() as cache_dir:
+        vector_store = build_vector_store(embeddings, chunks, cache_dir)
+
+        async def per_request(query):
+            return await asyncio.to_thread(vector_store.similarity_search, query, 3)
+
+        results = []
+        for clients in (int(c) for c in args.clients.split(",")):
+            coalescer = RetrievalCoalescer(lambda: vector_store, lambda: embeddings, window_ms=args.window_ms)
+            for mode, search in (("per-request", per_request), ("coalesced", coalescer.search)):
+                r = {"mode": mode, "clients": clients,
+                     **asyncio.run(run_load(search, queries, clients, args.requests))}
+                results.append(r)
+                print(json.dumps(r))
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Bursts of identical streaming requests against a fake LLM, with and
+without the SingleFlight layer used by fastapi_app.py.
+
+Requests in a burst arrive spread over --spread seconds, so later ones
+join mid-stream and must get the buffered prefix replayed. Reports the
+number of upstream calls and checks every client received the full text.
+
+    python benchmarks/bench_singleflight.py --clients 50 --spread 0.5
+"""
+import json
+import time
+import asyncio
+import argparse
+
+from common import latency_summary
+from fake_llm import FakeStreamingLLM
+from llm_singleflight import SingleFlight, stream_llm_text
+
+
+async def run_burst(use_singleflight, clients, spread, distinct_prompts):
+    llm = FakeStreamingLLM()
+    singleflight = SingleFlight()
+    expected = "".join(f"token{i} " for i in range(llm.chunks))
+    ttfb = []
+    mismatches = 0
+
+    async def client(n):
+        nonlocal mismatches
+        await asyncio.sleep(spread * n / clients)
+        prompt = f"prompt {n % distinct_prompts}"
+        if use_singleflight:
+            chunks = singleflight.stream(SingleFlight.make_key("insights", prompt),
+                                         lambda: stream_llm_text(llm, prompt))
+        else:
+            chunks = stream_llm_text(llm, prompt)
+        start = time.perf_counter()
+        received = []
+        async for content in chunks:
+            if not received:
+                ttfb.append((time.perf_counter() - start) * 1000)
+            received.append(content)
+        if "".join(received) != expected:
+            mismatches += 1
+
+    await asyncio.gather(*(client(n) for n in range(clients)))
+    return {
+        "singleflight": use_singleflight,
+        "clients": clients,
+        "distinct_prompts": distinct_prompts,
+        "upstream_calls": llm.calls,
+        "incomplete_streams": mismatches,
+        **latency_summary(ttfb, "ttfb"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-flight LLM stream sharing under bursts")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--spread", type=float, default=0.5, help="Seconds over which a burst arrives")
+    parser.add_argument("--distinct-prompts", type=int, default=2)
+    args = parser.parse_args()
+
+    for use_singleflight in (False, True):
+        print(json.dumps(asyncio.run(run_burst(use_singleflight, args.clients, args.spread, args.distinct_prompts))))
+
+
+if __name__ == "__main__":
+    main()
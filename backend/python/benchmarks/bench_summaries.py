@@ -0,0 +1,76 @@
+"""
+Runs the ingest-time summary queue over the sample PDFs with a fake model.
+
+Reports how long summarizing took, model calls made, PDFs dropped by the
+bounded queue and the achieved call rate against --rate-per-min, then
+prints one stored document summary. No Gemini calls are made.
+
+    python benchmarks/bench_summaries.py --rate-per-min 600 --queue 4
+"""
+import os
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+
+from common import sample_pdfs
+from fake_llm import FakeStreamingLLM
+from summaries import SummaryQueue, open_summary_store
+
+
+async def run(args, workdir):
+    llm = FakeStreamingLLM(chunks=args.tokens, ttft=args.ttft_ms / 1000, token_delay=0.0, text="word")
+    store = open_summary_store(workdir)
+    queue = SummaryQueue(store, lambda: llm, max_queue=args.queue, rate_per_min=args.rate_per_min,
+                         workers=args.workers, max_sections=args.max_sections)
+    queue.start()
+
+    sources = []
+    for src in sample_pdfs():
+        # Work on copies: section detection caches main2's .html next to the PDF.
+        path = shutil.copy(src, workdir)
+        sources.append(os.path.basename(path))
+        queue.submit(sources[-1], path)
+
+    start = time.perf_counter()
+    await queue.join()
+    elapsed = time.perf_counter() - start
+    await queue.stop()
+
+    summarized = [s for s in sources if store.get(s)]
+    result = {
+        **queue.stats,
+        "pdfs": len(sources),
+        "summarized": len(summarized),
+        "elapsed_s": round(elapsed, 2),
+        "calls_per_min": round(queue.stats["llm_calls"] / elapsed * 60, 1) if elapsed else None,
+        "rate_limit_per_min": args.rate_per_min,
+    }
+    print(json.dumps(result))
+    if summarized:
+        print(json.dumps(store.get(summarized[0]), indent=4)[:1500])
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exercise the summary queue against a fake model")
+    parser.add_argument("--rate-per-min", type=float, default=600)
+    parser.add_argument("--queue", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--max-sections", type=int, default=12)
+    parser.add_argument("--ttft-ms", type=float, default=50)
+    parser.add_argument("--tokens", type=int, default=20)
+    parser.add_argument("--out", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        result = asyncio.run(run(args, workdir))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
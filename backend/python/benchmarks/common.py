@@ -0,0 +1,49 @@
+"""Helpers shared by the benchmark scripts."""
+import os
+import sys
+import glob
+
+import numpy as np
+
+PYTHON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+UPLOAD_DIR = os.path.join(PYTHON_DIR, "..", "uploads")
+sys.path.insert(0, PYTHON_DIR)
+
+
+def sample_pdfs():
+    """Sample PDFs in backend/uploads, skipping timestamp-prefixed re-uploads of the same name."""
+    seen = set()
+    paths = []
+    for path in sorted(glob.glob(os.path.join(UPLOAD_DIR, "*.pdf"))):
+        name = os.path.basename(path).split("-", 1)[-1]
+        if name not in seen:
+            seen.add(name)
+            paths.append(path)
+    return paths
+
+
+def load_chunks(limit):
+    """Chunk the sample PDFs exactly like process_single_pdf_and_update_index does."""
+    import fitz  # PyMuPDF
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=5000, chunk_overlap=500)
+    chunks = []
+    for path in sample_pdfs():
+        with fitz.open(path) as doc:
+            text = "".join(page.get_text() for page in doc)
+        chunks.extend(splitter.split_text(text) if len(text) >= 5000 else [text])
+    if not chunks:
+        rng = np.random.default_rng(0)
+        words = "pdf document section heading acrobat convert france cuisine history travel".split()
+        chunks = [" ".join(rng.choice(words, 800)) for _ in range(200)]
+    while len(chunks) < limit:
+        chunks = chunks + chunks
+    return chunks[:limit]
+
+
+def latency_summary(latencies_ms, prefix="latency"):
+    return {
+        f"{prefix}_p50_ms": round(float(np.percentile(latencies_ms, 50)), 2),
+        f"{prefix}_p99_ms": round(float(np.percentile(latencies_ms, 99)), 2),
+    }
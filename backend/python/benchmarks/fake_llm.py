@@ -0,0 +1,60 @@
+"""Local stand-ins for the Gemini chat model, for benchmarks and manual checks."""
+import json
+import asyncio
+from types import SimpleNamespace
+
+
+class FakeStreamingLLM:
+    """
+    Mimics ChatGoogleGenerativeAI.astream: yields message chunks with a
+    .content attribute after a time-to-first-token delay, then one chunk
+    per token_delay. Counts upstream calls so sharing can be measured.
+    """
+
+    def __init__(self, chunks=20, ttft=0.3, token_delay=0.02, text="token"):
+        self.chunks = chunks
+        self.ttft = ttft
+        self.token_delay = token_delay
+        self.text = text
+        self.calls = 0
+        self.active = 0
+
+    async def astream(self, prompt):
+        self.calls += 1
+        self.active += 1
+        try:
+            await asyncio.sleep(self.ttft)
+            for i in range(self.chunks):
+                yield SimpleNamespace(content=f"{self.text}{i} ")
+                await asyncio.sleep(self.token_delay)
+        finally:
+            self.active -= 1
+
+
+class StubServerLLM:
+    """
+    Same interface as FakeStreamingLLM, but streams from the Gemini-style
+    stub in stub_servers.py over HTTP, so the app pays real network and
+    SSE parsing costs.
+    """
+
+    def __init__(self, base_url, model="stub"):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.calls = 0
+
+    async def astream(self, prompt):
+        import httpx
+
+        self.calls += 1
+        url = f"{self.base_url}/v1beta/models/{self.model}:streamGenerateContent"
+        body = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+        async with httpx.AsyncClient(timeout=None) as client:
+            async with client.stream("POST", url, params={"alt": "sse"}, json=body) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data: "):
+                        continue
+                    candidate = json.loads(line[len("data: "):])["candidates"][0]
+                    for part in candidate["content"]["parts"]:
+                        yield SimpleNamespace(content=part.get("text", ""))
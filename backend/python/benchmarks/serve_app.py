@@ -0,0 +1,42 @@
+"""
+Runs fastapi_app under uvicorn with its Gemini model replaced by
+StubServerLLM, so nothing leaves the machine. Point AZURE_TTS_ENDPOINT at
+stub_servers.py for TTS. Set UPLOAD_DIR / FAISS_CACHE_DIR to keep the
+benchmark's index away from the real one.
+
+    python benchmarks/serve_app.py --port 8001 --llm-url http://127.0.0.1:8911
+"""
+import os
+import argparse
+import tempfile
+from types import SimpleNamespace
+
+import uvicorn
+
+import common  # noqa: F401  (puts backend/python on sys.path)
+from fake_llm import StubServerLLM
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve fastapi_app against a stub LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--llm-url", default="http://127.0.0.1:8911")
+    args = parser.parse_args()
+
+    # fastapi_app refuses to start without a credentials file; the stub never reads it.
+    if not os.getenv("GOOGLE_APPLICATION_CREDENTIALS"):
+        creds = tempfile.NamedTemporaryFile("w", suffix=".json", delete=False)
+        creds.write("{}")
+        creds.close()
+        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = creds.name
+
+    import fastapi_app
+
+    llm = StubServerLLM(args.llm_url)
+    fastapi_app.get_conversational_chain = lambda: SimpleNamespace(llm_chain=SimpleNamespace(llm=llm))
+    uvicorn.run(fastapi_app.app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
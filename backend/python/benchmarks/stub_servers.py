@@ -0,0 +1,79 @@
+"""
+Stub upstream servers for the end-to-end benchmarks.
+
+One process serves both:
+  - a Gemini-style streaming endpoint,
+    POST /v1beta/models/{model}:streamGenerateContent?alt=sse, which waits
+    --ttft-ms, then sends --tokens SSE chunks --token-ms apart;
+  - the Azure OpenAI speech endpoint used by fetch_audio_chunk,
+    POST /openai/deployments/{deployment}/audio/speech, which returns
+    placeholder bytes after --tts-ms.
+
+    python benchmarks/stub_servers.py --port 8911 --ttft-ms 300 --token-ms 20
+"""
+import json
+import asyncio
+import argparse
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import Response, StreamingResponse
+
+
+def create_app(ttft_ms=300.0, token_ms=20.0, tokens=40, tts_ms=200.0):
+    app = FastAPI()
+    # llm_open counts streams in progress; llm_cancelled those the client closed early.
+    app.state.calls = {"llm": 0, "tts": 0, "llm_open": 0, "llm_cancelled": 0}
+
+    @app.post("/v1beta/models/{model_method}")
+    async def stream_generate_content(model_method: str, request: Request):
+        await request.body()
+        app.state.calls["llm"] += 1
+
+        async def events():
+            app.state.calls["llm_open"] += 1
+            finished = False
+            try:
+                await asyncio.sleep(ttft_ms / 1000)
+                for i in range(tokens):
+                    chunk = {"candidates": [{"content": {"role": "model", "parts": [{"text": f"token{i} "}]}, "index": 0}]}
+                    yield "data: " + json.dumps(chunk) + "\r\n\r\n"
+                    await asyncio.sleep(token_ms / 1000)
+                finished = True
+            finally:
+                app.state.calls["llm_open"] -= 1
+                if not finished:
+                    app.state.calls["llm_cancelled"] += 1
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/openai/deployments/{deployment}/audio/speech")
+    async def speech(deployment: str, request: Request):
+        await request.body()
+        app.state.calls["tts"] += 1
+        await asyncio.sleep(tts_ms / 1000)
+        # Not decodable audio; the TTS merge step is not part of these benchmarks.
+        return Response(content=b"ID3" + b"\x00" * 1024, media_type="audio/mpeg")
+
+    @app.get("/stats")
+    async def stats():
+        return app.state.calls
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub Gemini / Azure TTS servers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8911)
+    parser.add_argument("--ttft-ms", type=float, default=300.0)
+    parser.add_argument("--token-ms", type=float, default=20.0)
+    parser.add_argument("--tokens", type=int, default=40)
+    parser.add_argument("--tts-ms", type=float, default=200.0)
+    args = parser.parse_args()
+    app = create_app(args.ttft_ms, args.token_ms, args.tokens, args.tts_ms)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
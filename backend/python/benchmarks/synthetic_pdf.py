@@ -0,0 +1,83 @@
+"""
+Deterministic synthetic PDFs for the extraction and ingestion benchmarks.
+
+Each page gets `headings_per_page` headings (the first heading of a page
+is an H1, the rest H2) at the font sizes main1/main2 key on, each followed
+by body paragraphs. The same seed always produces the same document.
+
+    python benchmarks/synthetic_pdf.py out.pdf --pages 20 --headings-per-page 3
+"""
+import random
+import argparse
+import textwrap
+
+import fitz  # PyMuPDF
+
+# Topic words so main2's persona/job overlap scoring has something to match.
+VOCABULARY = (
+    "travel itinerary city museum cuisine restaurant wine coast beach history "
+    "festival market hotel budget tour guide culture architecture castle village "
+    "train ferry hiking nightlife family children activities tips packing season "
+    "form document signature export convert share review compliance workflow"
+).split()
+FILLER = "the a of and to in for with on at from by is are was were this that".split()
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 56
+BODY_SIZE, H1_SIZE, H2_SIZE = 10.5, 18, 14
+LINE_CHARS = 95
+
+
+def _sentence(rng):
+    words = [rng.choice(VOCABULARY if rng.random() < 0.4 else FILLER) for _ in range(rng.randint(8, 20))]
+    return " ".join(words).capitalize() + "."
+
+
+def _heading(rng):
+    return " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(2, 5))).title()
+
+
+def generate_pdf(path, pages=10, headings_per_page=2, seed=0):
+    """Writes the PDF to path and returns the number of headings placed."""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    line_height = BODY_SIZE * 1.4
+    usable = PAGE_HEIGHT - 2 * MARGIN
+    headings = 0
+    sections = max(headings_per_page, 1)
+    for _ in range(pages):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        y = MARGIN
+        # Body lines per section so the headings spread evenly down the page.
+        section_lines = max(1, int(usable / line_height / sections) - 3)
+        for h in range(sections):
+            if headings_per_page:
+                size = H1_SIZE if h == 0 else H2_SIZE
+                page.insert_text((MARGIN, y + size), _heading(rng), fontsize=size, fontname="hebo")
+                y += size * 1.8
+                headings += 1
+            paragraph = " ".join(_sentence(rng) for _ in range(section_lines))
+            for line in textwrap.wrap(paragraph, LINE_CHARS)[:section_lines]:
+                if y + line_height > PAGE_HEIGHT - MARGIN:
+                    break
+                page.insert_text((MARGIN, y + BODY_SIZE), line, fontsize=BODY_SIZE, fontname="helv")
+                y += line_height
+            y += line_height
+    doc.save(path)
+    doc.close()
+    return headings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic benchmark PDF")
+    parser.add_argument("out")
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--headings-per-page", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    n = generate_pdf(args.out, args.pages, args.headings_per_page, args.seed)
+    print(f"Wrote {args.out}: {args.pages} pages, {n} headings")
+
+
+if __name__ == "__main__":
+    main()
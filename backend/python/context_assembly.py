@@ -0,0 +1,201 @@
+import os
+import math
+from typing import List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from instrumentation import Histogram
+
+# -------------------------------
+
+# Configuration
+# -------------------------------
+
+# Upper bound on context tokens sent to the model per request.
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "4000"))
+# Chunks retrieved per request before merging and budgeting.
+CONTEXT_CANDIDATES = int(os.getenv("CONTEXT_CANDIDATES", "3"))
+# Chunks are split with chunk_overlap=500; look a little further to be safe.
+MAX_OVERLAP_CHARS = 1000
+# Shorter common edges are treated as coincidence, not chunk overlap.
+MIN_OVERLAP_CHARS = 50
+# Gemini's tokenizer is not available locally; ~4 characters per token for English text.
+CHARS_PER_TOKEN = 4
+
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+CONTEXT_TOKENS = Histogram("context_prompt_tokens", "Estimated context tokens per request, before and after assembly.", TOKEN_BUCKETS)
+
+# -------------------------------
+
+# Context assembly
+# -------------------------------
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _overlap(first: str, second: str) -> int:
+    """Length of the longest suffix of first that is a prefix of second (0 if under MIN_OVERLAP_CHARS)."""
+    if len(first) < MIN_OVERLAP_CHARS or len(second) < MIN_OVERLAP_CHARS:
+        return 0
+    probe = second[:MIN_OVERLAP_CHARS]
+    # Earliest match in the tail is the longest overlap.
+    i = first.find(probe, max(0, len(first) - MAX_OVERLAP_CHARS))
+    while i != -1:
+        if second.startswith(first[i:]):
+            return len(first) - i
+        i = first.find(probe, i + 1)
+    return 0
+
+
+class _Passage:
+    """
+    One or more merged chunks. spans records where each chunk's text sits in
+    the merged text with its retrieval rank, so truncation can keep the
+    best-ranked part; rank is the best among them.
+    """
+
+    def __init__(self, doc: Document, rank: int):
+        self.text = doc.page_content
+        self.source = doc.metadata.get("source")
+        chunk = doc.metadata.get("chunk")
+        # Positions of the merged chunks in their PDF, when recorded at ingestion.
+        self.chunks = {chunk} if isinstance(chunk, int) else set()
+        self.spans: List[Tuple[int, int, int]] = [(0, len(self.text), rank)]
+        self.rank = rank
+
+    def same_document(self, other: "_Passage") -> bool:
+        # Chunks indexed before sources were recorded can only be matched on text.
+        return self.source is None or other.source is None or self.source == other.source
+
+    def _edge_orders(self, other: "_Passage") -> List[bool]:
+        """Which concatenations to try: True for self + other, False for other + self."""
+        if self.chunks and other.chunks and self.source and self.source == other.source:
+            # Known positions: only neighbouring chunks can share a splitter overlap.
+            if min(other.chunks) == max(self.chunks) + 1:
+                return [True]
+            if min(self.chunks) == max(other.chunks) + 1:
+                return [False]
+            return []
+        return [True, False]
+
+    def try_merge(self, other: "_Passage") -> bool:
+        """Absorbs other if it is contained in, or overlaps either end of, this passage."""
+        if not self.same_document(other):
+            return False
+        if other.text in self.text:
+            merged = self.text
+            spans = self.spans + _shift(other.spans, self.text.find(other.text))
+        elif self.text in other.text:
+            merged = other.text
+            spans = _shift(self.spans, other.text.find(self.text)) + other.spans
+        else:
+            for self_first in self._edge_orders(other):
+                first, second = (self, other) if self_first else (other, self)
+                n = _overlap(first.text, second.text)
+                if n:
+                    merged = first.text + second.text[n:]
+                    spans = first.spans + _shift(second.spans, len(first.text) - n)
+                    break
+            else:
+                return False
+        self.text = merged
+        self.spans = spans
+        self.source = self.source or other.source
+        self.chunks |= other.chunks
+        self.rank = min(self.rank, other.rank)
+        return True
+
+
+def _shift(spans: List[Tuple[int, int, int]], offset: int) -> List[Tuple[int, int, int]]:
+    return [(start + offset, end + offset, rank) for start, end, rank in spans]
+
+
+def _truncate(passage: _Passage, tokens: int) -> str:
+    """
+    Cuts a passage to the token budget at word boundaries, keeping the text
+    from its best-ranked chunk onwards (reaching back before it only if the
+    end of the passage comes first), so a better match is never cut in
+    favour of a neighbour merged ahead of it.
+    """
+    text = passage.text
+    limit = tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    best = min(passage.spans, key=lambda span: span[2])[0]
+    start = max(0, min(best, len(text) - limit))
+    if start > 0:
+        space = text.find(" ", start, best + 1)
+        start = space + 1 if space != -1 else start
+    end = start + limit
+    if end < len(text):
+        cut = text.rfind(" ", start, end)
+        end = cut if cut > start else end
+    return text[start:end]
+
+
+def assemble_context(docs: List[Document], token_budget: Optional[int] = None,
+                     separator: str = "\n") -> Tuple[str, dict]:
+    """
+    Builds the prompt context from retrieved chunks, most relevant first.
+
+    Exact duplicates and chunks contained in another are dropped, chunks
+    from the same document whose edges overlap (the splitter's
+    chunk_overlap) are merged into one passage, and passages are added in
+    relevance order until the token budget is used; the passage that
+    crosses the budget is cut at a word boundary, keeping its best-ranked
+    chunk. Chunk positions recorded at ingestion restrict edge merges to
+    neighbouring chunks. Returns the context and
+    token stats for logging.
+    """
+    token_budget = CONTEXT_TOKEN_BUDGET if token_budget is None else token_budget
+    naive = separator.join(doc.page_content for doc in docs)
+
+    passages: List[_Passage] = []
+    for rank, doc in enumerate(docs):
+        passage = _Passage(doc, rank)
+        # A merge can make a passage overlap one it did not before, so keep folding.
+        merged = True
+        while merged:
+            merged = False
+            for existing in passages:
+                if existing.try_merge(passage):
+                    passages.remove(existing)
+                    passage = existing
+                    merged = True
+                    break
+        passages.append(passage)
+    passages.sort(key=lambda p: p.rank)
+
+    parts = []
+    used = 0
+    for passage in passages:
+        remaining = token_budget - used
+        if remaining <= 0:
+            break
+        text = _truncate(passage, remaining)
+        parts.append(text)
+        used += estimate_tokens(text)
+        if len(text) < len(passage.text):
+            break
+    context = separator.join(parts)
+
+    stats = {
+        "chunks": len(docs),
+        "passages": len(parts),
+        "tokens_before": estimate_tokens(naive),
+        "tokens_after": estimate_tokens(context),
+    }
+    stats["tokens_saved"] = stats["tokens_before"] - stats["tokens_after"]
+    return context, stats
+
+
+def build_context(kind: str, docs: List[Document], token_budget: Optional[int] = None) -> str:
+    """assemble_context plus the per-request log line and metrics."""
+    context, stats = assemble_context(docs, token_budget)
+    CONTEXT_TOKENS.observe(stats["tokens_before"], endpoint=kind, stage="retrieved")
+    CONTEXT_TOKENS.observe(stats["tokens_after"], endpoint=kind, stage="assembled")
+    print(f"{kind} context: {stats['chunks']} chunks -> {stats['passages']} passages, "
+          f"~{stats['tokens_after']} prompt tokens ({stats['tokens_saved']} saved)")
+    return context
@@ -0,0 +1,241 @@
+import os
+import json
+import time
+import inspect
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Callable, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# -------------------------------
+
+# Configuration
+# -------------------------------
+
+MODEL_NAME = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+
+# torch      - sentence-transformers on PyTorch, same vectors as HuggingFaceEmbeddings
+# torch-int8 - same model with nn.Linear layers dynamically quantized to int8
+# onnx       - model exported once to ONNX and run with ONNX Runtime
+# onnx-int8  - ONNX export with int8 dynamically quantized weights
+EMBEDDING_BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+if EMBEDDING_BACKEND not in EMBEDDING_BACKENDS:
+    raise ValueError(f"EMBEDDING_BACKEND must be one of {', '.join(EMBEDDING_BACKENDS)}, got '{EMBEDDING_BACKEND}'.")
+
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))  # 0 keeps the runtime default
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+# Concurrent embed_query calls are coalesced into one forward pass. With a
+# window of 0 the batcher never waits: queries that queue up while a batch
+# is running simply form the next batch.
+QUERY_BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_QUERY_BATCH_WINDOW_MS", "0"))
+QUERY_MAX_BATCH = int(os.getenv("EMBEDDING_QUERY_MAX_BATCH", "32"))
+ONNX_DIR = os.getenv("EMBEDDING_ONNX_DIR", "onnx_cache")
+
+# -------------------------------
+
+# Encoders
+# -------------------------------
+
+class SentenceTransformerEncoder:
+    """sentence-transformers on PyTorch, optionally with int8 dynamic quantization."""
+
+    def __init__(self, model_name: str = MODEL_NAME, quantize: bool = False, threads: int = EMBEDDING_THREADS):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if threads > 0:
+            torch.set_num_threads(threads)
+        self.model = SentenceTransformer(model_name, device="cpu")
+        if quantize:
+            self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def encode(self, texts: List[str], batch_size: int = EMBEDDING_BATCH_SIZE) -> np.ndarray:
+        return self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
+
+
+class OnnxEncoder:
+    """
+    The same transformer exported to ONNX and run with ONNX Runtime. Mean
+    pooling and normalization are done in numpy, mirroring the
+    sentence-transformers pipeline of the exported model.
+    """
+
+    def __init__(self, model_name: str = MODEL_NAME, quantize: bool = False,
+                 threads: int = EMBEDDING_THREADS, onnx_dir: str = ONNX_DIR):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_dir = os.path.join(onnx_dir, model_name.replace("/", "__"))
+        model_path = os.path.join(model_dir, "model-int8.onnx" if quantize else "model.onnx")
+        if not os.path.exists(model_path):
+            export_onnx_model(model_name, model_dir, quantize)
+        with open(os.path.join(model_dir, "pipeline.json"), "r", encoding="utf-8") as f:
+            pipeline = json.load(f)
+        self.max_seq_length = pipeline["max_seq_length"]
+        self.normalize = pipeline["normalize"]
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        tokens = self.tokenizer(texts, padding=True, truncation=True,
+                                max_length=self.max_seq_length, return_tensors="np")
+        feeds = {k: v.astype(np.int64) for k, v in tokens.items() if k in self.input_names}
+        hidden = self.session.run(None, feeds)[0]
+        mask = tokens["attention_mask"][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
+
+    def encode(self, texts: List[str], batch_size: int = EMBEDDING_BATCH_SIZE) -> np.ndarray:
+        # Batch texts of similar length together to keep padding small.
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        out = [None] * len(texts)
+        for start in range(0, len(texts), batch_size):
+            idx = order[start:start + batch_size]
+            for i, vec in zip(idx, self._encode_batch([texts[i] for i in idx])):
+                out[i] = vec
+        return np.stack(out) if out else np.zeros((0, 0), dtype=np.float32)
+
+
+def export_onnx_model(model_name: str, model_dir: str, quantize: bool = False) -> None:
+    """One-time export of the sentence-transformers model to ONNX (and int8)."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize
+
+    os.makedirs(model_dir, exist_ok=True)
+    st_model = SentenceTransformer(model_name, device="cpu")
+    transformer = st_model[0]
+    fp32_path = os.path.join(model_dir, "model.onnx")
+    if not os.path.exists(fp32_path):
+        dummy = transformer.tokenizer(["embedding export"], return_tensors="pt")
+        # Positional export arguments must follow the model's forward() order.
+        forward_params = inspect.signature(transformer.auto_model.forward).parameters
+        input_names = [name for name in forward_params if name in dummy]
+        torch.onnx.export(
+            transformer.auto_model,
+            tuple(dummy[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={**{name: {0: "batch", 1: "sequence"} for name in input_names},
+                          "last_hidden_state": {0: "batch", 1: "sequence"}},
+            opset_version=14,
+            # Newer torch defaults to the dynamo exporter, which needs onnxscript.
+            **({"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}),
+        )
+        transformer.tokenizer.save_pretrained(model_dir)
+        with open(os.path.join(model_dir, "pipeline.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "max_seq_length": st_model.max_seq_length,
+                "normalize": any(isinstance(module, Normalize) for module in st_model),
+            }, f)
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(fp32_path, os.path.join(model_dir, "model-int8.onnx"), weight_type=QuantType.QInt8)
+
+# -------------------------------
+
+# Query batching
+# -------------------------------
+
+class QueryBatcher:
+    """
+    Coalesces concurrent single-text encode calls from many threads into
+    batched forward passes on one worker thread.
+    """
+
+    def __init__(self, encode: Callable[[List[str]], np.ndarray],
+                 window_ms: float = QUERY_BATCH_WINDOW_MS, max_batch: int = QUERY_MAX_BATCH):
+        self._encode = encode
+        self._window = window_ms / 1000.0
+        self._max_batch = max_batch
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="query-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, text: str) -> np.ndarray:
+        return self.submit_many([text])[0]
+
+    def submit_many(self, texts: List[str]) -> List[np.ndarray]:
+        """Queues several texts at once, so they can share a forward pass with other callers'."""
+        futures = [Future() for _ in texts]
+        for text, future in zip(texts, futures):
+            self._queue.put((text, future))
+        return [future.result() for future in futures]
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self._window
+        while len(batch) < self._max_batch:
+            try:
+                remaining = deadline - time.monotonic()
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                vectors = self._encode([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+# -------------------------------
+
+# LangChain Embeddings
+# -------------------------------
+
+class BackendEmbeddings(Embeddings):
+    """LangChain Embeddings over a pluggable encoder, with batched query embedding."""
+
+    def __init__(self, encoder, batch_queries: bool = True):
+        self.encoder = encoder
+        self.batcher = QueryBatcher(self.encoder.encode) if batch_queries else None
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        # Same preprocessing as HuggingFaceEmbeddings so vectors stay comparable.
+        texts = [t.replace("\n", " ") for t in texts]
+        return self.encoder.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        text = text.replace("\n", " ")
+        if self.batcher is None:
+            return self.encoder.encode([text])[0].tolist()
+        return self.batcher.submit(text).tolist()
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """embed_query for many texts, through the query batcher when it is on."""
+        texts = [t.replace("\n", " ") for t in texts]
+        if self.batcher is None:
+            return self.encoder.encode(texts).tolist()
+        return [vector.tolist() for vector in self.batcher.submit_many(texts)]
+
+
+def get_embeddings(backend: str = EMBEDDING_BACKEND, model_name: str = MODEL_NAME,
+                   threads: int = EMBEDDING_THREADS, batch_queries: bool = True) -> BackendEmbeddings:
+    if backend in ("torch", "torch-int8"):
+        encoder = SentenceTransformerEncoder(model_name, quantize=backend == "torch-int8", threads=threads)
+    elif backend in ("onnx", "onnx-int8"):
+        encoder = OnnxEncoder(model_name, quantize=backend == "onnx-int8", threads=threads)
+    else:
+        raise ValueError(f"Unknown embedding backend '{backend}'.")
+    return BackendEmbeddings(encoder, batch_queries=batch_queries)
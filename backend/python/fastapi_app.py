@@ -2,24 +2,35 @@ import os
 import asyncio
 import fitz  # PyMuPDF
 import json
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.vectorstores import FAISS
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.chains.question_answering import load_qa_chain
 from langchain.prompts import PromptTemplate
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from embedding_backend import get_embeddings
+from vector_index import INDEX_TYPE, add_chunks_to_vector_store, batched_similarity_search, load_vector_store, open_chunk_store, save_vector_store
+from retrieval_batcher import RetrievalCoalescer
+from llm_singleflight import SINGLEFLIGHT_ENABLED, SingleFlight, stream_llm_text
+from admission import AdmissionController, AdmissionRejected, release_when_done
+from instrumentation import ProfileRequestMiddleware, render_prometheus, stage_timer
+from context_assembly import CONTEXT_CANDIDATES, CONTEXT_TOKENS, build_context
+from summaries import PRECOMPUTE_SUMMARIES, SummaryQueue, open_summary_store, summary_documents
+from upload_store import UploadStore
 import google.generativeai as genai
 from dotenv import load_dotenv
 from fastapi.responses import StreamingResponse
 
 
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.background import BackgroundTask
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, List, Optional
 import io
+import threading
+from concurrent.futures import Future
 
 
 # Adding some imports
@@ -43,6 +54,10 @@ class ChatRequest(BaseModel):
     question: str
     pdfFilename: Optional[str] = None
 
+class BatchQuestion(ChatRequest):
+    # Tags this question's events in the /chat-batch/ stream; defaults to its list index.
+    id: Optional[str] = None
+
 class TTSRequest(BaseModel):
     ssml: str
 
@@ -51,20 +66,30 @@ class TTSRequest(BaseModel):
 # Constants
 # ------------------------------- 
 
-CACHE_DIR = "faiss_cache"
+CACHE_DIR = os.getenv("FAISS_CACHE_DIR", "faiss_cache")
 if not os.path.exists(CACHE_DIR):
     os.makedirs(CACHE_DIR)
 
-UPLOAD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "uploads")
+# /chat-batch/: questions accepted per request, and model calls one batch runs at once
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "64"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "uploads"))
 if not os.path.exists(UPLOAD_DIR):
     os.makedirs(UPLOAD_DIR)
 
+# Opt-in: on startup, move plain uploads from before the content-addressed
+# store into it and delete their per-upload .html caches from UPLOAD_DIR
+UPLOAD_IMPORT_LEGACY = os.getenv("UPLOAD_IMPORT_LEGACY", "0") == "1"
+
 # ------------------------------- 
 
 # FastAPI App Initialization
 # ------------------------------- 
 
 app = FastAPI()
+# Opt-in cProfile dump for requests sent with "X-Profile: 1" (REQUEST_PROFILING=1)
+app.add_middleware(ProfileRequestMiddleware)
 
 # ------------------------------- 
 
@@ -73,7 +98,31 @@ app = FastAPI()
 
 embeddings = None
 vector_store: Optional[FAISS] = None
+chunk_store = None
 chain = None
+summary_store = None
+summary_queue: Optional[SummaryQueue] = None
+
+# Concurrent requests share one embedding pass and one FAISS search
+retriever = RetrievalCoalescer(lambda: vector_store, lambda: embeddings)
+
+# Identical concurrent prompts share one upstream model.astream call
+singleflight = SingleFlight()
+
+# Bounds concurrent Gemini/Azure work; excess requests queue by priority or get 429
+admission = AdmissionController()
+
+# One blob per unique uploaded PDF, shared with the Node server's uploads
+upload_store = UploadStore(UPLOAD_DIR)
+
+# Blobs being indexed right now; the watcher and /process-pdf/ both see new uploads.
+# Futures rather than asyncio objects: the watcher runs its own event loop.
+indexing_lock = threading.Lock()
+indexing_now: Dict[str, Future] = {}
+
+# Different PDFs are indexed in parallel threads, but updating the store is a
+# read-modify-write of vector_store, so one ingestion at a time takes it.
+ingest_lock = threading.Lock()
 
 # ------------------------------- 
 
@@ -85,7 +134,6 @@ async def process_single_pdf_and_update_index(pdf_file: str):
     Process a single PDF, extract text, split into chunks,
     embed, and update FAISS index incrementally.
     """
-    global vector_store
     if not os.path.exists(UPLOAD_DIR):
         return
 
@@ -93,6 +141,32 @@ async def process_single_pdf_and_update_index(pdf_file: str):
     if not os.path.exists(file_path):
         return
 
+    # Byte-identical uploads share a blob; each blob is indexed and summarized once
+    sha = await asyncio.to_thread(upload_store.resolve, pdf_file)
+    with indexing_lock:
+        running = indexing_now.get(sha)
+        if running is None:
+            if chunk_store.get_meta(f"indexed:{sha}") is not None:
+                print(f"{pdf_file} is already indexed as {sha[:12]}, skipping")
+                return
+            run = indexing_now[sha] = Future()
+    if running is not None:
+        # Another caller is indexing the same bytes; finish when it does (or fail with it).
+        print(f"{pdf_file} is being indexed as {sha[:12]}, waiting")
+        await asyncio.wrap_future(running)
+        return
+    try:
+        await index_pdf(pdf_file, file_path, sha)
+        run.set_result(None)
+    except BaseException as e:
+        run.set_exception(e)
+        raise
+    finally:
+        with indexing_lock:
+            del indexing_now[sha]
+
+
+async def index_pdf(pdf_file: str, file_path: str, sha: str):
     # Read PDF
     with open(file_path, "rb") as f:
         pdf_bytes = f.read()
@@ -104,23 +178,39 @@ async def process_single_pdf_and_update_index(pdf_file: str):
         return
 
     # Split into chunks
-    if len(raw_text) < 5000:
-        text_chunks = [raw_text]
-    else:
-        text_chunks = await asyncio.to_thread(
-            lambda: RecursiveCharacterTextSplitter(
-                chunk_size=5000, chunk_overlap=500
-            ).split_text(raw_text)
+    with stage_timer("chunk_split"):
+        if len(raw_text) < 5000:
+            text_chunks = [raw_text]
+        else:
+            text_chunks = await asyncio.to_thread(
+                lambda: RecursiveCharacterTextSplitter(
+                    chunk_size=5000, chunk_overlap=500
+                ).split_text(raw_text)
+            )
+
+    # Update or create FAISS index (chunk text goes to the on-disk chunk store).
+    # Source and position let context assembly merge neighbouring chunks.
+    metadatas = [{"source": pdf_file, "sha256": sha, "chunk": i} for i in range(len(text_chunks))]
+    await asyncio.to_thread(update_vector_store, text_chunks, metadatas)
+    chunk_store.set_meta(f"indexed:{sha}", pdf_file)
+
+    # Optional background summaries for insights/podcast (PRECOMPUTE_SUMMARIES=1).
+    # Keyed by blob; main2's .html cache for section detection lands next to it.
+    if summary_queue is not None:
+        summary_queue.submit(sha, upload_store.blob_path(sha))
+
+
+def update_vector_store(text_chunks: List[str], metadatas: List[dict]):
+    """Add chunks to the current store and save it, under ingest_lock."""
+    global vector_store
+    with ingest_lock:
+        vector_store = add_chunks_to_vector_store(
+            vector_store, embeddings, chunk_store, text_chunks, INDEX_TYPE, metadatas
         )
 
-    # Update or create FAISS index
-    if vector_store is None:
-        vector_store = FAISS.from_texts(text_chunks, embedding=embeddings)
-    else:
-        vector_store.add_texts(text_chunks)
-
-    # Save FAISS index to disk
-    vector_store.save_local(CACHE_DIR)
+        # Save FAISS index to disk
+        with stage_timer("index_save"):
+            save_vector_store(vector_store, CACHE_DIR)
 
 
 # ------------------------------- 
@@ -144,12 +234,9 @@ class PDFFileHandler(FileSystemEventHandler):
 async def startup_event():
     if not os.path.exists(os.getenv("GOOGLE_APPLICATION_CREDENTIALS")):
         raise RuntimeError("GOOGLE_APPLICATION_CREDENTIALS file not found.")
-    global embeddings, vector_store, chain
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2",
-        model_kwargs={'device': 'cpu'},
-        encode_kwargs={'batch_size': 64}
-    )
+    global embeddings, vector_store, chain, chunk_store, summary_store, summary_queue
+    # EMBEDDING_BACKEND picks torch / torch-int8 / onnx / onnx-int8 for all-MiniLM-L6-v2
+    embeddings = get_embeddings()
 
     chain = get_conversational_chain()
 
@@ -159,8 +246,20 @@ async def startup_event():
     observer.start()
 
 # Load existing FAISS index if available
-    if os.path.exists(CACHE_DIR) and os.listdir(CACHE_DIR):
-        vector_store = FAISS.load_local(CACHE_DIR, embeddings, allow_dangerous_deserialization=True)
+    chunk_store = open_chunk_store(CACHE_DIR)
+    vector_store = load_vector_store(CACHE_DIR, embeddings, chunk_store, INDEX_TYPE)
+
+    summary_store = open_summary_store(CACHE_DIR)
+    if PRECOMPUTE_SUMMARIES:
+        summary_queue = SummaryQueue(summary_store, lambda: chain.llm_chain.llm)
+        summary_queue.start()
+
+    # GC only touches blobs/ and .tmp/; the legacy import rewrites files in UPLOAD_DIR itself
+    if UPLOAD_IMPORT_LEGACY:
+        imported = await asyncio.to_thread(upload_store.import_legacy)
+        print(f"Upload store: imported {imported} legacy uploads")
+    collected = await asyncio.to_thread(upload_store.gc)
+    print(f"Upload store: {collected}, {upload_store.stats()}")
 # ------------------------------- 
 
 # Utility functions
@@ -172,7 +271,8 @@ async def extract_text_from_pdf_async(pdf_doc: UploadFile):
         pdf_bytes = pdf_doc.file.read()
         with fitz.open(stream=pdf_bytes, filetype="pdf") as document:
             return "".join(page.get_text() for page in document)
-    return await asyncio.to_thread(open_pdf_and_extract_text)
+    with stage_timer("pdf_extract"):
+        return await asyncio.to_thread(open_pdf_and_extract_text)
 
 def get_conversational_chain():
     prompt_template = """
@@ -202,10 +302,8 @@ def get_conversational_chain():
 @app.post("/process-pdf/")
 async def process_pdf_endpoint(file: UploadFile = File(...)):
     try:
-        # Save uploaded PDF
-        file_path = os.path.join(UPLOAD_DIR, file.filename)
-        with open(file_path, "wb") as f:
-            f.write(await file.read())
+        # Save uploaded PDF, hashing while it streams; a duplicate only adds an alias
+        await asyncio.to_thread(upload_store.put_stream, file.file, file.filename)
 
         # Process only this file
         await process_single_pdf_and_update_index(file.filename)
@@ -213,18 +311,39 @@ async def process_pdf_endpoint(file: UploadFile = File(...)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-async def astream_chat_generator(request: ChatRequest):
-    """Generator function for streaming chat responses."""
-    global vector_store, chain
-    if vector_store is None:
-        yield "data: " + json.dumps({"error": "PDFs not processed yet."}) + "\n\n"
-        return
+def too_busy_response(e: AdmissionRejected):
+    return JSONResponse(
+        status_code=429,
+        content={"error": "Server is busy, please retry.", "detail": str(e)},
+        headers={"Retry-After": str(e.retry_after)},
+    )
 
-    docs = vector_store.similarity_search(request.question, k=3)
-    
-    context = "\n".join(doc.page_content for doc in docs)
-    
-    prompt_template = """
+async def admitted_stream(endpoint: str, events):
+    """Waits for an admission slot, then streams events as SSE holding that slot."""
+    try:
+        ticket = await admission.acquire(endpoint)
+    except AdmissionRejected as e:
+        return too_busy_response(e)
+    # The background task covers clients that disconnect before the stream starts.
+    return StreamingResponse(
+        release_when_done(events, ticket),
+        media_type="text/event-stream",
+        background=BackgroundTask(ticket.release),
+    )
+
+def model_text_stream(kind: str, prompt: str):
+    """Text chunks of the model's answer to prompt, sharing identical in-flight streams."""
+    model = chain.llm_chain.llm
+    if SINGLEFLIGHT_ENABLED:
+        return singleflight.stream(SingleFlight.make_key(kind, prompt), lambda: stream_llm_text(model, prompt, kind))
+    return stream_llm_text(model, prompt, kind)
+
+async def stream_model_output(kind: str, prompt: str):
+    """Streams the model's answer to prompt as SSE events."""
+    async for content in model_text_stream(kind, prompt):
+        yield "data: " + json.dumps({"output_text": content}) + "\n\n"
+
+CHAT_PROMPT_TEMPLATE = """
     You are a strict question-answering assistant.
     Your task is to answer the user’s question using ONLY the information from the provided context.  
 
@@ -241,24 +360,108 @@ async def astream_chat_generator(request: ChatRequest):
 
     Answer:
     """
-    
-    formatted_prompt = prompt_template.format(context=context, question=request.question)
 
-    model = chain.llm_chain.llm
+async def astream_chat_generator(request: ChatRequest):
+    """Generator function for streaming chat responses."""
+    global vector_store, chain
+    if vector_store is None:
+        yield "data: " + json.dumps({"error": "PDFs not processed yet."}) + "\n\n"
+        return
+
+    docs = await retriever.search(request.question, k=CONTEXT_CANDIDATES)
+    
+    context = build_context("chat", docs)
     
-    async for chunk in model.astream(formatted_prompt):
-        content = chunk.content
-        if content:
-            yield "data: " + json.dumps({"output_text": content}) + "\n\n"
+    formatted_prompt = CHAT_PROMPT_TEMPLATE.format(context=context, question=request.question)
+
+    async for event in stream_model_output("chat", formatted_prompt):
+        yield event
 
 @app.post("/chat-stream/")
 async def chat_stream_endpoint(request: ChatRequest):
     """Endpoint to handle streaming chat."""
-    return StreamingResponse(
-        astream_chat_generator(request),
-        media_type="text/event-stream"
+    return await admitted_stream("chat", astream_chat_generator(request))
+
+def format_batch_event(event: dict, fmt: str) -> str:
+    line = json.dumps(event)
+    return line + "\n" if fmt == "ndjson" else "data: " + line + "\n\n"
+
+async def answer_batch_question(question_id: str, request: BatchQuestion, docs, semaphore: asyncio.Semaphore,
+                                events: asyncio.Queue, closed: asyncio.Event):
+    """
+    Streams one batch question's answer into the shared event queue. Every
+    way out, cancellation included, ends with a done or error event, unless
+    the batch stream itself has closed.
+    """
+    terminal = {"id": question_id, "done": True}
+    try:
+        prompt = CHAT_PROMPT_TEMPLATE.format(context=build_context("batch", docs), question=request.question)
+        async with semaphore:
+            ticket = await admission.acquire("batch")
+            try:
+                async for content in model_text_stream("batch", prompt):
+                    await events.put({"id": question_id, "output_text": content})
+            finally:
+                ticket.release()
+    except AdmissionRejected as e:
+        terminal = {"id": question_id, "error": "Server is busy, please retry.", "retry_after": e.retry_after}
+    except BaseException as e:
+        terminal = {"id": question_id, "error": str(e) or f"{type(e).__name__} while answering"}
+        if not isinstance(e, Exception):
+            raise
+    finally:
+        if not closed.is_set():
+            await events.put(terminal)
+
+async def astream_batch_generator(questions: List[BatchQuestion], fmt: str):
+    """Answers every question, interleaving their chunks as they arrive, each tagged with its id."""
+    if vector_store is None:
+        yield format_batch_event({"error": "PDFs not processed yet."}, fmt)
+        return
+
+    # One embedding pass and one FAISS search for the whole batch
+    results = await asyncio.to_thread(
+        batched_similarity_search, vector_store, embeddings, [q.question for q in questions], CONTEXT_CANDIDATES
     )
 
+    ids = [q.id if q.id is not None else str(i) for i, q in enumerate(questions)]
+    semaphore = asyncio.Semaphore(BATCH_LLM_CONCURRENCY)
+    # Bounded so a slow client holds back the model streams instead of buffering them.
+    events: asyncio.Queue = asyncio.Queue(maxsize=256)
+    closed = asyncio.Event()
+    tasks = [
+        asyncio.create_task(answer_batch_question(question_id, question, docs, semaphore, events, closed))
+        for question_id, question, docs in zip(ids, questions, results)
+    ]
+    try:
+        finished = 0
+        while finished < len(tasks):
+            event = await events.get()
+            if "output_text" not in event:
+                finished += 1
+            yield format_batch_event(event, fmt)
+        yield format_batch_event({"done": True}, fmt)
+    finally:
+        # Client disconnected: stop the remaining model calls.
+        closed.set()
+        for task in tasks:
+            task.cancel()
+
+@app.post("/chat-batch/")
+async def chat_batch_endpoint(questions: List[BatchQuestion], fmt: str = Query("sse", alias="format")):
+    """
+    Answers a list of chat questions in one stream. Events carry the
+    question's id; format=ndjson gives one JSON object per line instead of SSE.
+    """
+    if not questions:
+        raise HTTPException(status_code=400, detail="At least one question is required.")
+    if len(questions) > BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_QUESTIONS} questions per batch.")
+    if fmt not in ("sse", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'sse' or 'ndjson'.")
+    media_type = "application/x-ndjson" if fmt == "ndjson" else "text/event-stream"
+    return StreamingResponse(astream_batch_generator(questions, fmt), media_type=media_type)
+
 async def astream_podcast_generator(request: ChatRequest):
     """Generator function for streaming podcast scripts."""
     global vector_store, chain
@@ -266,9 +469,11 @@ async def astream_podcast_generator(request: ChatRequest):
         yield "data: " + json.dumps({"error": "PDFs not processed yet."}) + "\n\n"
         return
 
-    docs = vector_store.similarity_search(request.question, k=3)
+    docs = await retriever.search(request.question, k=CONTEXT_CANDIDATES)
+    # Precomputed document/section summaries of the open PDF, when available, lead the context.
+    docs = summary_documents(summary_store, await asyncio.to_thread(upload_store.resolve, request.pdfFilename)) + docs
     
-    context = "\n".join(doc.page_content for doc in docs)
+    context = build_context("podcast", docs)
     
     podcast_prompt_template = """
     You are an expert podcast scriptwriter. Your task is to create an engaging and informative podcast script with two hosts, Speaker A and Speaker B, based on the provided text.
@@ -294,21 +499,14 @@ async def astream_podcast_generator(request: ChatRequest):
     
     formatted_prompt = podcast_prompt_template.format(context=context, question=request.question)
 
-    model = chain.llm_chain.llm
-    
-    async for chunk in model.astream(formatted_prompt):
-        content = chunk.content
-        if content:
-            yield "data: " + json.dumps({"output_text": content}) + "\n\n"
+    async for event in stream_model_output("podcast", formatted_prompt):
+        yield event
 
 
 @app.post("/podcast-stream/")
 async def podcast_stream_endpoint(request: ChatRequest):
     """Endpoint to handle streaming podcast script generation."""
-    return StreamingResponse(
-        astream_podcast_generator(request),
-        media_type="text/event-stream"
-    )
+    return await admitted_stream("podcast", astream_podcast_generator(request))
 
 async def astream_insights_generator(request: ChatRequest):
     """Generator function for streaming insights."""
@@ -319,9 +517,11 @@ async def astream_insights_generator(request: ChatRequest):
 
     # The user's selected text from the PDF comes in the 'question' field
     selected_text = request.question
-    docs = vector_store.similarity_search(selected_text, k=3)
+    docs = await retriever.search(selected_text, k=CONTEXT_CANDIDATES)
+    # The document summary of the open PDF, when precomputed, adds background after the matches.
+    docs = docs + summary_documents(summary_store, await asyncio.to_thread(upload_store.resolve, request.pdfFilename), sections=False)
     
-    context = "\n".join(doc.page_content for doc in docs)
+    context = build_context("insights", docs)
     
     # Define the insights prompt template directly on the backend
     insights_prompt_template = """
@@ -340,21 +540,14 @@ async def astream_insights_generator(request: ChatRequest):
     
     formatted_prompt = insights_prompt_template.format(context=context, question=selected_text)
 
-    model = chain.llm_chain.llm
-    
-    async for chunk in model.astream(formatted_prompt):
-        content = chunk.content
-        if content:
-            yield "data: " + json.dumps({"output_text": content}) + "\n\n"
+    async for event in stream_model_output("insights", formatted_prompt):
+        yield event
 
 
 @app.post("/insights-stream/")
 async def insights_stream_endpoint(request: ChatRequest):
     """Endpoint to handle streaming insights generation."""
-    return StreamingResponse(
-        astream_insights_generator(request),
-        media_type="text/event-stream"
-    )
+    return await admitted_stream("insights", astream_insights_generator(request))
 
 def fetch_audio_chunk(text: str, voice: str) -> bytes:
     """Fetches a single audio chunk from Azure OpenAI TTS."""
@@ -368,8 +561,9 @@ def fetch_audio_chunk(text: str, voice: str) -> bytes:
     payload = {"model": deployment, "input": text, "voice": voice, "response_format": "mp3"}
 
     try:
-        response = requests.post(url, headers=headers, json=payload, timeout=20)
-        response.raise_for_status()  # Raise an exception for bad status codes
+        with stage_timer("tts_fetch"):
+            response = requests.post(url, headers=headers, json=payload, timeout=20)
+            response.raise_for_status()  # Raise an exception for bad status codes
         return response.content
     except requests.exceptions.RequestException as e:
         print(f"Error fetching audio for text '{text[:30]}...': {e}")
@@ -388,6 +582,17 @@ async def text_to_speech_endpoint(request: TTSRequest):
     if not dialogue_chunks:
         raise HTTPException(status_code=400, detail="No valid text found in SSML voice tags.")
 
+    try:
+        ticket = await admission.acquire("tts")
+    except AdmissionRejected as e:
+        return too_busy_response(e)
+    try:
+        return await synthesize_dialogue(dialogue_chunks)
+    finally:
+        ticket.release()
+
+async def synthesize_dialogue(dialogue_chunks):
+    """Fetches TTS audio for each dialogue chunk in parallel and merges it into one mp3 stream."""
     # 2. GENERATE AUDIO FOR EACH CHUNK IN PARALLEL
     voices = ['nova', 'alloy']  # Speaker A: nova, Speaker B: alloy
     
@@ -409,18 +614,33 @@ async def text_to_speech_endpoint(request: TTSRequest):
 
     # 3. COMBINE AUDIO FILES IN-MEMORY using pydub
     # This is cleaner as it avoids writing temporary files to disk
-    combined_audio = AudioSegment.empty()
-    for audio_bytes in valid_audio_chunks:
-        segment = AudioSegment.from_file(io.BytesIO(audio_bytes), format="mp3")
-        combined_audio += segment
+    with stage_timer("tts_merge"):
+        combined_audio = AudioSegment.empty()
+        for audio_bytes in valid_audio_chunks:
+            segment = AudioSegment.from_file(io.BytesIO(audio_bytes), format="mp3")
+            combined_audio += segment
 
-    # 4. PREPARE FINAL AUDIO FOR STREAMING
-    final_audio_buffer = io.BytesIO()
-    combined_audio.export(final_audio_buffer, format="mp3")
-    final_audio_buffer.seek(0)
+        # 4. PREPARE FINAL AUDIO FOR STREAMING
+        final_audio_buffer = io.BytesIO()
+        combined_audio.export(final_audio_buffer, format="mp3")
+        final_audio_buffer.seek(0)
 
     return StreamingResponse(final_audio_buffer, media_type="audio/mpeg")
 
+@app.get("/summaries/{pdf_filename}")
+async def summaries_endpoint(pdf_filename: str):
+    """Precomputed summaries of one ingested PDF, returned without calling the model."""
+    sha = await asyncio.to_thread(upload_store.resolve, pdf_filename)
+    stored = summary_store.get(sha) if summary_store is not None and sha else None
+    if stored is None:
+        raise HTTPException(status_code=404, detail=f"No summaries for {pdf_filename}.")
+    return JSONResponse(content={"pdfFilename": pdf_filename, "sha256": sha, **stored})
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus text-format metrics: per-stage latency histograms and admission state."""
+    return PlainTextResponse(render_prometheus(admission.prometheus_lines(), CONTEXT_TOKENS.prometheus_lines()))
+
 
 if __name__ == "__main__":
     import uvicorn
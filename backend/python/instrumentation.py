@@ -0,0 +1,167 @@
+import os
+import sys
+import json
+import time
+import bisect
+import cProfile
+import pstats
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+# -------------------------------
+
+# Configuration
+# -------------------------------
+
+# Requests carrying "X-Profile: 1" are run under cProfile when this is set.
+REQUEST_PROFILING = os.getenv("REQUEST_PROFILING", "0") == "1"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# -------------------------------
+
+# Histograms
+# -------------------------------
+
+class Histogram:
+    """Cumulative Prometheus-style histogram, one series per label set. Thread-safe."""
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            # Per-bucket (non-cumulative) counts; summed up when rendered.
+            i = bisect.bisect_left(self.buckets, value)
+            if i < len(self.buckets):
+                series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def summary(self) -> Dict[str, dict]:
+        """count / sum / mean per label set, for the timing blocks of the CLI scripts."""
+        with self._lock:
+            items = list(self._series.items())
+        out = {}
+        for key, (_, total, count) in items:
+            name = ",".join(str(v) for _, v in key) or self.name
+            out[name] = {"count": count, "total_s": round(total, 4), "mean_s": round(total / count, 4) if count else 0.0}
+        return out
+
+    def prometheus_lines(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, [list(s[0]), s[1], s[2]]) for key, s in self._series.items())
+        for key, (counts, total, count) in items:
+            labels = ",".join(f'{k}="{v}"' for k, v in key)
+            prefix = labels + "," if labels else ""
+            cumulative = 0
+            for bucket, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bucket}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {total:.6f}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("stage_duration_seconds", "Wall time per pipeline stage.")
+
+
+@contextmanager
+def stage_timer(stage: str, **labels):
+    """Times the enclosed block into stage_duration_seconds{stage=...}. Works inside coroutines too."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage, **labels)
+
+
+def observe_stage(stage: str, seconds: float, **labels):
+    STAGE_SECONDS.observe(seconds, stage=stage, **labels)
+
+
+def render_prometheus(*extra_lines: List[str]) -> str:
+    lines = STAGE_SECONDS.prometheus_lines()
+    for block in extra_lines:
+        lines.extend(block)
+    return "\n".join(lines) + "\n"
+
+
+def emit_timing_block(stream=sys.stderr):
+    """Prints per-stage totals as one JSON line. The CLI scripts use stderr so stdout stays pure JSON."""
+    print(json.dumps({"timing": STAGE_SECONDS.summary()}), file=stream)
+
+# -------------------------------
+
+# Per-request profiler
+# -------------------------------
+
+class ProfileRequestMiddleware:
+    """
+    ASGI middleware: with REQUEST_PROFILING=1, a request sent with header
+    "X-Profile: 1" runs under cProfile until its response body is fully
+    sent (so streamed SSE responses are covered), and the profile is
+    written to PROFILE_DIR as .prof plus a cumulative-time .txt summary.
+
+    cProfile is per thread, so work done concurrently for other requests on
+    the event loop shows up too; profile one request on a quiet server.
+    """
+
+    def __init__(self, app, enabled: bool = REQUEST_PROFILING, profile_dir: str = PROFILE_DIR):
+        self.app = app
+        self.enabled = enabled
+        self.profile_dir = profile_dir
+        self._busy = False
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http" or self._busy:
+            return await self.app(scope, receive, send)
+        headers = dict(scope.get("headers") or [])
+        if headers.get(b"x-profile") != b"1":
+            return await self.app(scope, receive, send)
+
+        self._busy = True
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        finished = False
+
+        def finish():
+            nonlocal finished
+            if finished:
+                return
+            finished = True
+            profiler.disable()
+            self._busy = False
+            self._dump(profiler, scope["path"], time.perf_counter() - start)
+
+        async def send_wrapper(message):
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finish()
+
+    def _dump(self, profiler: cProfile.Profile, path: str, elapsed: float):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        name = f"{int(time.time() * 1000)}-{path.strip('/').replace('/', '_') or 'root'}"
+        prof_path = os.path.join(self.profile_dir, name + ".prof")
+        profiler.dump_stats(prof_path)
+        with open(os.path.join(self.profile_dir, name + ".txt"), "w", encoding="utf-8") as f:
+            f.write(f"{path} took {elapsed:.3f}s\n")
+            pstats.Stats(profiler, stream=f).sort_stats("cumulative").print_stats(40)
+        print(f"Wrote request profile {prof_path} ({elapsed:.3f}s)")
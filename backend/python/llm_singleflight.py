@@ -0,0 +1,117 @@
+import os
+import time
+import asyncio
+import hashlib
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from instrumentation import observe_stage
+
+# -------------------------------
+
+# Configuration
+# -------------------------------
+
+SINGLEFLIGHT_ENABLED = os.getenv("LLM_SINGLEFLIGHT", "1") != "0"
+
+# -------------------------------
+
+# Single-flight streams
+# -------------------------------
+
+class _Flight:
+    """One upstream stream plus everything it has produced so far."""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.changed = asyncio.Condition()
+        self.task: Optional[asyncio.Task] = None
+
+
+class SingleFlight:
+    """
+    Shares one upstream LLM stream between identical concurrent requests.
+
+    The first request for a key starts the upstream stream; requests with
+    the same key that arrive while it is running subscribe to it, get the
+    chunks produced so far replayed, then follow it live. Once the stream
+    finishes the key is forgotten, so this never serves stale answers. If
+    every subscriber disconnects the upstream call is cancelled.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.upstream_calls = 0
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def stream(self, key: str, start: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            self._flights[key] = flight
+            self.upstream_calls += 1
+            flight.task = asyncio.create_task(self._pump(key, flight, start))
+
+        flight.subscribers += 1
+        try:
+            i = 0
+            while True:
+                async with flight.changed:
+                    await flight.changed.wait_for(lambda: len(flight.chunks) > i or flight.done)
+                while i < len(flight.chunks):
+                    yield flight.chunks[i]
+                    i += 1
+                if flight.done and i >= len(flight.chunks):
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                # Forget the key now: the cancelled pump may take a while to unwind,
+                # and a request arriving meanwhile must start a fresh stream.
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+
+    async def _pump(self, key: str, flight: _Flight, start: Callable[[], AsyncIterator[str]]):
+        try:
+            async for chunk in start():
+                async with flight.changed:
+                    flight.chunks.append(chunk)
+                    flight.changed.notify_all()
+        except asyncio.CancelledError:
+            # Subscribers still waiting get an ordinary error, never this
+            # task's cancellation.
+            flight.error = RuntimeError("Shared LLM stream was cancelled")
+            raise
+        except Exception as e:
+            flight.error = e
+        finally:
+            # Forget the key first so a request arriving now starts a fresh stream.
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            async with flight.changed:
+                flight.done = True
+                flight.changed.notify_all()
+
+
+async def stream_llm_text(model, prompt: str, kind: str = "llm") -> AsyncIterator[str]:
+    """Text content of model.astream(prompt), skipping empty chunks. Records TTFT and stream time."""
+    start = time.perf_counter()
+    first = True
+    async for chunk in model.astream(prompt):
+        if chunk.content:
+            if first:
+                observe_stage("llm_time_to_first_token", time.perf_counter() - start, endpoint=kind)
+                first = False
+            yield chunk.content
+    observe_stage("llm_stream", time.perf_counter() - start, endpoint=kind)
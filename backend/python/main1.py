@@ -5,6 +5,7 @@ import json
 from math import ceil
 import os
 import sys
+from instrumentation import stage_timer, emit_timing_block
 global page
 page = 0
 def do_it(soup):
@@ -172,11 +173,14 @@ if __name__ == "__main__":
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
     pdf_file = str(sys.argv[1])
     html_file = "output.html"
-    pdf_to_html(pdf_file, html_file)
+    with stage_timer("page_parse"):
+        pdf_to_html(pdf_file, html_file)
     with open("./output.html", 'r', encoding="utf-8") as f:
         html = f.read()
-    soup = BeautifulSoup(html, 'html.parser')
-    final = do_it(soup)
+    with stage_timer("html_parse"):
+        soup = BeautifulSoup(html, 'html.parser')
+    with stage_timer("heading_filter"):
+        final = do_it(soup)
     sizes = set()
     for i in final:
         sizes.add(i[0])
@@ -192,4 +196,6 @@ if __name__ == "__main__":
             output["outline"].append({"level": "H2", "text": i[2], "page": i[3]})
         elif i[0] == sizes[2]:
             output["outline"].append({"level": "H3", "text": i[2], "page": i[3]})
-    print(json.dumps(output, indent=4))
\ No newline at end of file
+    print(json.dumps(output, indent=4))
+    # Per-stage timings go to stderr; stdout is parsed as JSON by index.js.
+    emit_timing_block()
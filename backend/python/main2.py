@@ -5,11 +5,13 @@ import nltk
 import fitz
 import re
 import argparse
+import uuid
 from nltk.tokenize import sent_tokenize
 from nltk.corpus import stopwords
 from collections import Counter
 import sys
 from bs4 import BeautifulSoup
+from instrumentation import stage_timer, emit_timing_block
 nltk.download("punkt", quiet=True)
 nltk.download("punkt_tab", quiet=True)
 nltk.download("stopwords", quiet=True)
@@ -138,8 +140,12 @@ def extract_html_with_structure(pdf_path, out_html="structured_output.html"):
                 full_para = " ".join(paragraph_html)
                 html.append(f"<p style='{style}'>{full_para}</p>")
     html.append("</body></html>")
-    with open(out_html, "w", encoding="utf-8") as f:
+    # The cache is shared by every upload of the same PDF (and the summary worker):
+    # write it under a private name and rename, so readers never see a partial file.
+    tmp_html = f"{out_html}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_html, "w", encoding="utf-8") as f:
         f.write("\n".join(html))
+    os.replace(tmp_html, out_html)
     doc.close()
 
 def _decode_unicode_escapes_iter(s: str, rounds: int = 3) -> str:
@@ -269,20 +275,8 @@ class DocumentAnalyst:
         ordered_top_sentences = [s for s in sentences if s in top_sentences]
         return " ".join(ordered_top_sentences)
 
-    def analyze_documents(self, input_data):
-        documents = input_data.get("documents", [])
-        persona = input_data.get("persona", "")
-        job = input_data.get("job_to_be_done", "")
-        all_sections = []
-        for doc in documents:
-            pdf_path = doc.get("document_path", "")
-            if not os.path.exists(pdf_path):
-                continue
-            sections = self.extract_sections_from_pdf(pdf_path)
-            for section in sections:
-                section["file_name"] = doc.get("file_name", "")
-                section["relevance"] = self.calculate_relevance(section, persona, job)
-                all_sections.append(section)
+    def top_sections(self, all_sections, k=10):
+        """Most relevant of each run of same-titled sections, then the k most relevant overall."""
         temp = []
         i = 0
         while i < len(all_sections):
@@ -297,36 +291,107 @@ class DocumentAnalyst:
             t.sort(key=lambda x: x["relevance"], reverse=True)
             temp.append(t[0])
             i = j
-        all_sections = temp
-        all_sections.sort(key=lambda x: x["relevance"], reverse=True)
-        top_sections = all_sections[:10]
+        temp.sort(key=lambda x: x["relevance"], reverse=True)
+        return temp[:k]
+
+    def analyze_documents(self, input_data, on_document=None):
+        """
+        on_document(index, doc, sections, all_sections) is called after each
+        document is parsed and scored (sections is None for a missing file),
+        so callers can report progress; the result does not depend on it.
+        """
+        documents = input_data.get("documents", [])
+        persona = input_data.get("persona", "")
+        job = input_data.get("job_to_be_done", "")
+        all_sections = []
+        for index, doc in enumerate(documents):
+            pdf_path = doc.get("document_path", "")
+            if not os.path.exists(pdf_path):
+                if on_document is not None:
+                    on_document(index, doc, None, all_sections)
+                continue
+            with stage_timer("parse"):
+                sections = self.extract_sections_from_pdf(pdf_path)
+            with stage_timer("ranking"):
+                for section in sections:
+                    section["file_name"] = doc.get("file_name", "")
+                    section["relevance"] = self.calculate_relevance(section, persona, job)
+                    all_sections.append(section)
+            if on_document is not None:
+                on_document(index, doc, sections, all_sections)
+        with stage_timer("dedupe_sort"):
+            top_sections = self.top_sections(all_sections)
         output_sections = []
-        for section in top_sections:
-            refined_text = self.extract_subsections(section["content"])
-            output_sections.append({
-                "section_title": section["title"],
-                "page_number": section["page_number"],
-                "refined_text": refined_text,
-                "file_name": section["file_name"]
-            })
+        with stage_timer("refine"):
+            for section in top_sections:
+                refined_text = self.extract_subsections(section["content"])
+                output_sections.append({
+                    "section_title": section["title"],
+                    "page_number": section["page_number"],
+                    "refined_text": refined_text,
+                    "file_name": section["file_name"]
+                })
         return {"sections": output_sections}
 
+def emit_event(event):
+    """One NDJSON line on stdout, flushed so index.js can forward it at once."""
+    print(json.dumps(event), flush=True)
+
+def stream_progress(analyzer, total):
+    """on_document callback for --stream: per-document progress plus the provisional top sections."""
+    def on_document(index, doc, sections, all_sections):
+        emit_event({
+            "event": "document",
+            "index": index,
+            "documents": total,
+            "file_name": doc.get("file_name", ""),
+            "sections": None if sections is None else len(sections),
+            "skipped": sections is None,
+        })
+        emit_event({
+            "event": "provisional",
+            "documents_done": index + 1,
+            "sections": [
+                {
+                    "section_title": s["title"],
+                    "page_number": s["page_number"],
+                    "file_name": s["file_name"],
+                    "relevance": round(s["relevance"], 4),
+                }
+                for s in analyzer.top_sections(all_sections)
+            ],
+        })
+    return on_document
+
 def main2():
     parser = argparse.ArgumentParser(description="Analyze documents based on persona and job-to-be-done")
     parser.add_argument("input_file", help="Path to input JSON file")
+    parser.add_argument("--stream", action="store_true",
+                        help="Print NDJSON progress events and provisional rankings, ending with a result event")
     args = parser.parse_args()
 
     try:
         with open(args.input_file, 'r') as f:
             input_data = json.load(f)
         analyzer = DocumentAnalyst()
-        output = analyzer.analyze_documents(input_data)
+        if args.stream:
+            total = len(input_data.get("documents", []))
+            emit_event({"event": "start", "documents": total})
+            output = analyzer.analyze_documents(input_data, on_document=stream_progress(analyzer, total))
+            # Same sections, in the same order, as the batch output below.
+            emit_event({"event": "result", **output})
+        else:
+            output = analyzer.analyze_documents(input_data)
 
-        # print(json.dumps(output, indent=4, ensure_ascii=False))
-        print(json.dumps(output, indent=4))
+            # print(json.dumps(output, indent=4, ensure_ascii=False))
+            print(json.dumps(output, indent=4))
+        # Per-stage timings go to stderr; stdout is parsed as JSON by index.js.
+        emit_timing_block()
 
     except Exception as e:
+        if args.stream:
+            emit_event({"event": "error", "detail": str(e)})
         sys.exit(1)
 
 if __name__ == "__main__":
-    main2()
\ No newline at end of file
+    main2()
@@ -0,0 +1,81 @@
+import os
+import asyncio
+from typing import Callable, List, Optional, Set, Tuple
+
+from langchain_core.documents import Document
+
+from vector_index import batched_similarity_search
+
+# -------------------------------
+
+# Configuration
+# -------------------------------
+
+# How long the first query of a batch waits for others to join it.
+RETRIEVAL_BATCH_WINDOW_MS = float(os.getenv("RETRIEVAL_BATCH_WINDOW_MS", "3"))
+RETRIEVAL_MAX_BATCH = int(os.getenv("RETRIEVAL_MAX_BATCH", "64"))
+
+# -------------------------------
+
+# Request coalescer
+# -------------------------------
+
+class RetrievalCoalescer:
+    """
+    Collects similarity searches issued by concurrent requests within a
+    short window, embeds them in one batch and runs one batched FAISS
+    search off the event loop. Each caller gets back its own documents.
+    """
+
+    def __init__(self, get_vector_store: Callable, get_embeddings: Callable,
+                 window_ms: float = RETRIEVAL_BATCH_WINDOW_MS, max_batch: int = RETRIEVAL_MAX_BATCH):
+        self._get_vector_store = get_vector_store
+        self._get_embeddings = get_embeddings
+        self._window = window_ms / 1000.0
+        self._max_batch = max_batch
+        self._pending: List[Tuple[str, int, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # The loop only keeps weak references to tasks; hold running batches until they finish.
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def search(self, query: str, k: int = 3) -> List[Document]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((query, k, future))
+        if len(self._pending) >= self._max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        # Callers that went away (client disconnect) are dropped from the batch.
+        batch = [item for item in batch if not item[2].done()]
+        if not batch:
+            return
+        try:
+            results = await asyncio.to_thread(
+                batched_similarity_search,
+                self._get_vector_store(),
+                self._get_embeddings(),
+                [query for query, _, _ in batch],
+                max(k for _, k, _ in batch),
+            )
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, k, future), docs in zip(batch, results):
+            if not future.done():
+                future.set_result(docs[:k])
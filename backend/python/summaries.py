@@ -0,0 +1,290 @@
+import os
+import time
+import sqlite3
+import asyncio
+import threading
+from typing import Callable, Dict, List, Optional
+
+import fitz  # PyMuPDF
+from langchain_core.documents import Document
+
+from llm_singleflight import stream_llm_text
+
+# -------------------------------
+
+# Configuration
+# -------------------------------
+
+# Off by default: every ingested PDF costs one model call per section plus one.
+PRECOMPUTE_SUMMARIES = os.getenv("PRECOMPUTE_SUMMARIES", "0") == "1"
+# PDFs waiting for summaries; further PDFs are skipped (and logged) while full.
+SUMMARY_QUEUE_SIZE = int(os.getenv("SUMMARY_QUEUE_SIZE", "16"))
+# Model calls per minute across all summary workers.
+SUMMARY_RATE_PER_MIN = float(os.getenv("SUMMARY_RATE_PER_MIN", "30"))
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "1"))
+# Longest sections first; the rest only feed the document summary through them.
+SUMMARY_MAX_SECTIONS = int(os.getenv("SUMMARY_MAX_SECTIONS", "12"))
+SUMMARY_SECTION_CHARS = int(os.getenv("SUMMARY_SECTION_CHARS", "6000"))
+SUMMARY_DB_NAME = "summaries.sqlite3"
+
+SECTION_PROMPT = """
+Summarize the following section of a document in 3-5 sentences.
+Keep the key facts, figures and named entities. Do not add information that is not in the text.
+
+Section title: {title}
+
+Section text:
+{text}
+
+Summary:
+"""
+
+DOCUMENT_PROMPT = """
+Below are summaries of the sections of one document.
+Write a single summary of the whole document in one paragraph of at most 8 sentences,
+covering its purpose, main topics and most important takeaways.
+
+{sections}
+
+Document summary:
+"""
+
+# -------------------------------
+
+# Summary store
+# -------------------------------
+
+class SummaryStore:
+    """
+    SQLite table of precomputed summaries, kept in the FAISS cache dir next
+    to the chunk store. One row per (source PDF, section); the document
+    summary is stored under section "".
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            "source TEXT NOT NULL, section TEXT NOT NULL, page INTEGER, summary TEXT NOT NULL, "
+            "created REAL NOT NULL, PRIMARY KEY (source, section))"
+        )
+        self._conn.commit()
+
+    def put(self, source: str, section: str, page: Optional[int], summary: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (source, section, page, summary, created) VALUES (?, ?, ?, ?, ?)",
+                (source, section, page, summary, time.time()),
+            )
+            self._conn.commit()
+
+    def has(self, source: str, section: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM summaries WHERE source = ? AND section = ?", (source, section)
+            ).fetchone() is not None
+
+    def get(self, source: str) -> Optional[dict]:
+        """{"document": str or None, "sections": [{title, page, summary}]}, or None if nothing is stored."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT section, page, summary FROM summaries WHERE source = ? ORDER BY page, rowid", (source,)
+            ).fetchall()
+        if not rows:
+            return None
+        return {
+            "document": next((s for section, _, s in rows if section == ""), None),
+            "sections": [{"title": section, "page": page, "summary": s} for section, page, s in rows if section],
+        }
+
+    def delete(self, source: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM summaries WHERE source = ?", (source,))
+            self._conn.commit()
+
+
+def open_summary_store(cache_dir: str) -> SummaryStore:
+    return SummaryStore(os.path.join(cache_dir, SUMMARY_DB_NAME))
+
+
+def summary_documents(store: Optional[SummaryStore], source: Optional[str], sections: bool = True) -> List[Document]:
+    """Stored summaries of one PDF as Documents for context assembly, document summary first."""
+    stored = store.get(source) if store is not None and source else None
+    if stored is None:
+        return []
+    docs = []
+    if stored["document"]:
+        docs.append(Document(page_content=stored["document"], metadata={"source": source, "summary": "document"}))
+    if sections:
+        docs += [
+            Document(page_content=f"{s['title']}: {s['summary']}", metadata={"source": source, "summary": "section", "page": s["page"]})
+            for s in stored["sections"]
+        ]
+    return docs
+
+# -------------------------------
+
+# Section detection
+# -------------------------------
+
+def detect_sections(pdf_path: str) -> List[dict]:
+    """
+    Sections of a PDF as main2 sees them: [{title, page, text}] in document
+    order, with main2's per-paragraph entries joined under their heading.
+    """
+    # main2 downloads NLTK data when imported; only pay for that when summaries are on.
+    from main2 import convert_html_to_sections, extract_html_with_structure
+
+    html_file = pdf_path.replace(".pdf", "") + ".html"
+    if not os.path.exists(html_file):
+        extract_html_with_structure(pdf_path, html_file)
+    with open(html_file, "r", encoding="utf-8", errors="replace") as f:
+        paragraphs = convert_html_to_sections(f.read())
+
+    sections: List[dict] = []
+    for p in paragraphs:
+        if sections and sections[-1]["title"] == p["title"]:
+            sections[-1]["text"] += "\n" + p["content"]
+        else:
+            sections.append({"title": p["title"], "page": p["page_number"], "text": p["content"]})
+    return sections
+
+
+def _pdf_text(pdf_path: str) -> str:
+    with fitz.open(pdf_path) as document:
+        return "".join(page.get_text() for page in document)
+
+# -------------------------------
+
+# Background job queue
+# -------------------------------
+
+class RateLimiter:
+    """Async token bucket: rate_per_min acquisitions per minute, bursting up to burst."""
+
+    def __init__(self, rate_per_min: float, burst: int = 1):
+        self.interval = 60.0 / rate_per_min if rate_per_min > 0 else 0.0
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) / self.interval)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) * self.interval)
+
+
+async def generate_text(model, prompt: str) -> str:
+    return "".join([chunk async for chunk in stream_llm_text(model, prompt, "summary")]).strip()
+
+
+class SummaryQueue:
+    """
+    Bounded queue of PDFs to summarize after ingestion. Workers summarize
+    the longest sections of each PDF, then the document from those section
+    summaries, with every model call passing one shared rate limiter.
+    Sections already in the store are skipped, so re-ingesting a PDF only
+    fills in what is missing.
+    """
+
+    def __init__(self, store: SummaryStore, get_model: Callable, max_queue: int = SUMMARY_QUEUE_SIZE,
+                 rate_per_min: float = SUMMARY_RATE_PER_MIN, workers: int = SUMMARY_WORKERS,
+                 max_sections: int = SUMMARY_MAX_SECTIONS):
+        self.store = store
+        self.get_model = get_model
+        self.limiter = RateLimiter(rate_per_min)
+        self.workers = workers
+        self.max_sections = max_sections
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._pending: set = set()
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats: Dict[str, int] = {"queued": 0, "dropped": 0, "done": 0, "failed": 0, "llm_calls": 0}
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def submit(self, source: str, pdf_path: str):
+        """Queues a PDF. Safe to call from other threads (the upload watcher runs its own loop)."""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._enqueue(source, pdf_path)
+        else:
+            self._loop.call_soon_threadsafe(self._enqueue, source, pdf_path)
+
+    def _enqueue(self, source: str, pdf_path: str):
+        if source in self._pending:
+            return
+        try:
+            self._queue.put_nowait((source, pdf_path))
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            print(f"Summary queue full, skipping {source}")
+            return
+        self._pending.add(source)
+        self.stats["queued"] += 1
+
+    async def join(self):
+        await self._queue.join()
+
+    async def _worker(self):
+        while True:
+            source, pdf_path = await self._queue.get()
+            try:
+                await self.summarize(source, pdf_path)
+                self.stats["done"] += 1
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"Summarizing {source} failed: {e}")
+            finally:
+                self._pending.discard(source)
+                self._queue.task_done()
+
+    async def _generate(self, prompt: str) -> str:
+        await self.limiter.acquire()
+        self.stats["llm_calls"] += 1
+        return await generate_text(self.get_model(), prompt)
+
+    async def summarize(self, source: str, pdf_path: str):
+        sections = await asyncio.to_thread(detect_sections, pdf_path)
+        if not sections:
+            # No headings detected: summarize the start of the text as the document summary.
+            if not self.store.has(source, ""):
+                text = await asyncio.to_thread(_pdf_text, pdf_path)
+                if text.strip():
+                    prompt = SECTION_PROMPT.format(title=source, text=text[:SUMMARY_SECTION_CHARS])
+                    self.store.put(source, "", None, await self._generate(prompt))
+            return
+        chosen = sorted(sections, key=lambda s: len(s["text"]), reverse=True)[:self.max_sections]
+        chosen.sort(key=lambda s: s["page"])
+        for section in chosen:
+            if self.store.has(source, section["title"]):
+                continue
+            prompt = SECTION_PROMPT.format(title=section["title"], text=section["text"][:SUMMARY_SECTION_CHARS])
+            self.store.put(source, section["title"], section["page"], await self._generate(prompt))
+
+        stored = self.store.get(source)
+        if stored is None or stored["document"] is not None:
+            return
+        listing = "\n\n".join(f"{s['title']}:\n{s['summary']}" for s in stored["sections"])
+        self.store.put(source, "", None, await self._generate(DOCUMENT_PROMPT.format(sections=listing)))
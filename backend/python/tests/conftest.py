@@ -0,0 +1,7 @@
+import os
+import sys
+
+PYTHON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+# App modules, plus the fake model and synthetic PDF helpers from benchmarks/.
+sys.path.insert(0, PYTHON_DIR)
+sys.path.insert(0, os.path.join(PYTHON_DIR, "benchmarks"))
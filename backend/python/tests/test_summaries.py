@@ -0,0 +1,100 @@
+"""
+SummaryQueue against FakeStreamingLLM on a synthetic PDF; no Gemini calls.
+
+    python -m pytest tests/test_summaries.py
+"""
+import time
+import asyncio
+
+from fake_llm import FakeStreamingLLM
+from synthetic_pdf import generate_pdf
+from summaries import RateLimiter, SummaryQueue, open_summary_store
+
+
+class TimedLLM(FakeStreamingLLM):
+    """FakeStreamingLLM that records when each call starts."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.started = []
+
+    def astream(self, prompt):
+        self.started.append(time.monotonic())
+        return super().astream(prompt)
+
+
+def test_stores_section_and_document_summaries(tmp_path):
+    pdf = str(tmp_path / "doc.pdf")
+    generate_pdf(pdf, pages=3, headings_per_page=2)
+    store = open_summary_store(str(tmp_path))
+    llm = FakeStreamingLLM(chunks=5, ttft=0, token_delay=0, text="word")
+
+    async def run():
+        queue = SummaryQueue(store, lambda: llm, rate_per_min=0, workers=1, max_sections=4)
+        queue.start()
+        queue.submit("doc.pdf", pdf)
+        await queue.join()
+        await queue.stop()
+        return queue.stats
+
+    stats = asyncio.run(run())
+    stored = store.get("doc.pdf")
+    assert stats["done"] == 1 and stats["failed"] == 0
+    assert stored is not None
+    assert 1 <= len(stored["sections"]) <= 4
+    assert all(s["summary"].startswith("word0") for s in stored["sections"])
+    assert stored["document"].startswith("word0")
+    # One call per section plus one for the document.
+    assert llm.calls == len(stored["sections"]) + 1 == stats["llm_calls"]
+
+
+def test_full_queue_drops_extra_pdfs(tmp_path):
+    store = open_summary_store(str(tmp_path))
+    llm = FakeStreamingLLM(chunks=1, ttft=0, token_delay=0)
+
+    async def run():
+        queue = SummaryQueue(store, lambda: llm, max_queue=2, rate_per_min=0, workers=1)
+        queue.start()
+        # Workers only get to run once this coroutine awaits, so the queue fills up.
+        for i in range(5):
+            queue.submit(f"doc{i}.pdf", str(tmp_path / f"doc{i}.pdf"))
+        queue.submit("doc0.pdf", str(tmp_path / "doc0.pdf"))
+        stats = dict(queue.stats)
+        await queue.stop()
+        return stats
+
+    stats = asyncio.run(run())
+    assert stats["queued"] == 2
+    assert stats["dropped"] == 3
+
+
+def test_rate_limiter_spaces_calls(tmp_path):
+    pdf = str(tmp_path / "doc.pdf")
+    generate_pdf(pdf, pages=2, headings_per_page=2)
+    store = open_summary_store(str(tmp_path))
+    llm = TimedLLM(chunks=1, ttft=0, token_delay=0)
+    rate_per_min = 600  # one call per 0.1s
+
+    async def run():
+        queue = SummaryQueue(store, lambda: llm, rate_per_min=rate_per_min, workers=2, max_sections=3)
+        queue.start()
+        queue.submit("doc.pdf", pdf)
+        await queue.join()
+        await queue.stop()
+
+    asyncio.run(run())
+    assert len(llm.started) >= 3
+    gaps = [b - a for a, b in zip(llm.started, llm.started[1:])]
+    assert min(gaps) >= 0.09
+
+
+def test_rate_limiter_allows_burst():
+    limiter = RateLimiter(rate_per_min=60, burst=3)
+
+    async def run():
+        start = time.monotonic()
+        for _ in range(3):
+            await limiter.acquire()
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) < 0.1
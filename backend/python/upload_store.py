@@ -0,0 +1,243 @@
+import os
+import time
+import uuid
+import shutil
+import hashlib
+import threading
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+# -------------------------------
+
+# Configuration
+# -------------------------------
+
+# Layout shared with uploadStore.js (Node writes uploads, FastAPI indexes them):
+#   uploads/<alias>.pdf            what routes and the watcher see; a hard link to its blob
+#   uploads/blobs/<sha256>.pdf     one blob per unique document
+#   uploads/blobs/<sha256>.<kind>  artifacts derived from that blob (main2 .html, main1 outline)
+#   uploads/.tmp/                  uploads being hashed, linked into blobs/ when complete
+# The blob's hard-link count is its reference count: a blob whose only link is
+# blobs/<sha256>.pdf has no aliases left and is garbage.
+BLOB_DIR_NAME = "blobs"
+TMP_DIR_NAME = ".tmp"
+CHUNK_SIZE = 1 << 20
+# Unfinished uploads older than this are removed by gc().
+TMP_MAX_AGE_S = 3600
+# Times an upload is re-committed when its blob is collected before it could be linked.
+COMMIT_ATTEMPTS = 3
+
+# -------------------------------
+
+# Content-addressed upload store
+# -------------------------------
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class UploadStore:
+    """
+    Content-addressed store for uploaded PDFs. Every unique document is
+    kept once under blobs/; uploads appear under their alias as hard links
+    to that blob, so existing code can keep opening uploads/<alias>.pdf.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self.blob_dir = os.path.join(self.root, BLOB_DIR_NAME)
+        self.tmp_dir = os.path.join(self.root, TMP_DIR_NAME)
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        # (st_dev, st_ino) -> sha256, so resolving an alias does not re-read the file.
+        self._inodes: Dict[Tuple[int, int], str] = {}
+
+    def blob_path(self, sha: str, kind: str = "pdf") -> str:
+        return os.path.join(self.blob_dir, f"{sha}.{kind}")
+
+    def alias_path(self, alias: str) -> str:
+        return os.path.join(self.root, os.path.basename(alias))
+
+    def put_stream(self, stream: BinaryIO, alias: str) -> str:
+        """Stores a PDF read from stream under alias, hashing as it is written. Returns its sha256."""
+        digest = hashlib.sha256()
+        tmp = os.path.join(self.tmp_dir, uuid.uuid4().hex)
+        with open(tmp, "wb") as f:
+            for block in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                digest.update(block)
+                f.write(block)
+        sha = digest.hexdigest()
+        try:
+            for attempt in range(COMMIT_ATTEMPTS):
+                self._commit(tmp, sha)
+                try:
+                    self.add_alias(sha, alias)
+                    break
+                except FileNotFoundError:
+                    # The blob was collected between commit and link: store it again.
+                    if attempt == COMMIT_ATTEMPTS - 1:
+                        raise
+        finally:
+            os.remove(tmp)
+        return sha
+
+    def _commit(self, tmp: str, sha: str):
+        """Makes tmp the blob for sha unless one exists; the first writer's inode always wins."""
+        blob = self.blob_path(sha)
+        try:
+            os.link(tmp, blob)
+        except FileExistsError:
+            pass  # Duplicate upload: keep the blob we already have.
+        except OSError:
+            # No hard links on this filesystem; aliases are copies there anyway.
+            if not os.path.exists(blob):
+                shutil.copyfile(tmp, blob)
+
+    def add_alias(self, sha: str, alias: str):
+        """Points alias at the blob, replacing whatever alias pointed to before."""
+        target = self.alias_path(alias)
+        blob = self.blob_path(sha)
+        if os.path.exists(target) and os.path.samefile(target, blob):
+            return
+        # Link under a temporary name, then rename, so the watcher never sees a partial file.
+        tmp = os.path.join(self.tmp_dir, uuid.uuid4().hex)
+        try:
+            os.link(blob, tmp)
+        except FileNotFoundError:
+            raise
+        except OSError:
+            # No hard links on this filesystem: fall back to a copy (not reference-counted).
+            shutil.copyfile(blob, tmp)
+        os.replace(tmp, target)
+
+    def remove_alias(self, alias: str) -> Optional[str]:
+        """Drops alias and collects its blob if that was the last reference. Returns the blob's sha256."""
+        sha = self.resolve(alias)
+        try:
+            os.remove(self.alias_path(alias))
+        except FileNotFoundError:
+            pass
+        if sha is not None:
+            self.collect(sha)
+        return sha
+
+    def resolve(self, alias: Optional[str]) -> Optional[str]:
+        """sha256 of the document an alias refers to, or None if there is no such upload."""
+        if not alias:
+            return None
+        try:
+            st = os.stat(self.alias_path(alias))
+        except FileNotFoundError:
+            return None
+        key = (st.st_dev, st.st_ino)
+        sha = self._inodes.get(key)
+        if sha is not None and not self._is_blob_of(alias, sha):
+            # Node collected that blob and the filesystem reused its inode.
+            sha = None
+        if sha is None:
+            self._scan_blobs()
+            sha = self._inodes.get(key) or hash_file(self.alias_path(alias))
+        return sha
+
+    def _is_blob_of(self, alias: str, sha: str) -> bool:
+        try:
+            return os.path.samefile(self.alias_path(alias), self.blob_path(sha))
+        except FileNotFoundError:
+            return False
+
+    def _scan_blobs(self):
+        """Rebuilds the inode map from blobs/, dropping blobs deleted behind our back."""
+        inodes = {}
+        for name in os.listdir(self.blob_dir):
+            if name.endswith(".pdf"):
+                try:
+                    st = os.stat(os.path.join(self.blob_dir, name))
+                except FileNotFoundError:
+                    continue
+                inodes[(st.st_dev, st.st_ino)] = name[:-len(".pdf")]
+        self._inodes = inodes
+
+    def refcount(self, sha: str) -> int:
+        try:
+            return os.stat(self.blob_path(sha)).st_nlink - 1
+        except FileNotFoundError:
+            return 0
+
+    def derived_paths(self, sha: str) -> List[str]:
+        return [
+            os.path.join(self.blob_dir, name) for name in os.listdir(self.blob_dir)
+            if name.startswith(sha + ".") and name != sha + ".pdf"
+        ]
+
+    def collect(self, sha: str) -> bool:
+        """Deletes the blob and everything derived from it if no alias references it."""
+        with self._lock:
+            if self.refcount(sha) > 0:
+                return False
+            for path in [self.blob_path(sha)] + self.derived_paths(sha):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        self._inodes = {k: v for k, v in self._inodes.items() if v != sha}
+        return True
+
+    def import_legacy(self) -> int:
+        """
+        Moves plain uploads (from before this store) into blobs/ and re-links
+        them as aliases, so byte-identical copies share one blob. main2's
+        <alias>.html caches next to them are dropped; they are rebuilt per blob.
+        """
+        imported = 0
+        for name in sorted(os.listdir(self.root)):
+            path = os.path.join(self.root, name)
+            if not name.endswith(".pdf") or not os.path.isfile(path) or os.stat(path).st_nlink > 1:
+                continue
+            sha = hash_file(path)
+            # The first copy of a document becomes its blob (copied where there are no hard links).
+            self._commit(path, sha)
+            self.add_alias(sha, name)
+            imported += 1
+        for name in os.listdir(self.root):
+            if name.endswith(".html") and os.path.isfile(os.path.join(self.root, name)):
+                os.remove(os.path.join(self.root, name))
+        return imported
+
+    def gc(self) -> dict:
+        """Collects unreferenced blobs, derived artifacts whose blob is gone and stale partial uploads."""
+        collected = 0
+        orphans = 0
+        with self._lock:
+            names = os.listdir(self.blob_dir)
+        blobs = {name[:-len(".pdf")] for name in names if name.endswith(".pdf")}
+        for sha in blobs:
+            if self.collect(sha):
+                collected += 1
+        for name in names:
+            sha = name.split(".", 1)[0]
+            if sha not in blobs:
+                try:
+                    os.remove(os.path.join(self.blob_dir, name))
+                    orphans += 1
+                except FileNotFoundError:
+                    pass
+        now = time.time()
+        for name in os.listdir(self.tmp_dir):
+            path = os.path.join(self.tmp_dir, name)
+            if now - os.path.getmtime(path) > TMP_MAX_AGE_S:
+                os.remove(path)
+        return {"blobs_collected": collected, "orphan_artifacts": orphans}
+
+    def stats(self) -> dict:
+        names = os.listdir(self.blob_dir)
+        blobs = [name[:-len(".pdf")] for name in names if name.endswith(".pdf")]
+        return {
+            "blobs": len(blobs),
+            "aliases": sum(self.refcount(sha) for sha in blobs),
+            "derived_artifacts": len(names) - len(blobs),
+            "blob_bytes": sum(os.path.getsize(self.blob_path(sha)) for sha in blobs),
+        }
@@ -0,0 +1,379 @@
+import os
+import json
+import math
+import sqlite3
+import threading
+import uuid
+from typing import Dict, Iterable, List, Optional
+
+import faiss
+import numpy as np
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from instrumentation import stage_timer
+
+# -------------------------------
+
+# Configuration
+# -------------------------------
+
+# flat   - exact search (IndexFlatL2), the original behaviour
+# ivf    - inverted lists over full vectors (IVF<nlist>,Flat)
+# ivfpq  - inverted lists over product-quantized codes (IVF<nlist>,PQ<m>)
+# ivfsq8 - inverted lists over 8-bit scalar-quantized codes (IVF<nlist>,SQ8)
+# hnsw   - graph index, no training (HNSW<m>)
+# sq8    - exhaustive search over 8-bit scalar-quantized codes (SQ8)
+INDEX_TYPES = ("flat", "ivf", "ivfpq", "ivfsq8", "hnsw", "sq8")
+TRAINED_INDEX_TYPES = ("ivf", "ivfpq", "ivfsq8", "sq8")
+
+INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat").lower()
+if INDEX_TYPE not in INDEX_TYPES:
+    raise ValueError(f"FAISS_INDEX_TYPE must be one of {', '.join(INDEX_TYPES)}, got '{INDEX_TYPE}'.")
+
+# Below this many chunks a trained index is not worth it (and PQ cannot be
+# trained at all), so the store stays flat until the corpus grows past it.
+TRAIN_MIN_VECTORS = int(os.getenv("FAISS_TRAIN_MIN_VECTORS", "2000"))
+# Retrain once the corpus has grown by this factor since the last training,
+# so nlist and the quantizers keep up with the data.
+REBUILD_GROWTH = float(os.getenv("FAISS_REBUILD_GROWTH", "2.0"))
+NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+EF_CONSTRUCTION = int(os.getenv("FAISS_EF_CONSTRUCTION", "128"))
+EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "128"))
+PQ_M = int(os.getenv("FAISS_PQ_M", "48"))
+MAX_TRAIN_VECTORS = int(os.getenv("FAISS_MAX_TRAIN_VECTORS", "100000"))
+# PQ codebooks have 256 centroids per sub-quantizer; FAISS refuses to train them on fewer points.
+PQ_MIN_TRAIN_VECTORS = 256
+
+CHUNK_DB_NAME = "chunks.sqlite3"
+
+# FAISS indexes (HNSW and IVF in particular) must not be searched while
+# vectors are added, and the position -> ID map has to change together with
+# the index. Ingestion and searches run in worker threads, so both hold this.
+INDEX_LOCK = threading.Lock()
+
+# -------------------------------
+
+# On-disk chunk store
+# -------------------------------
+
+class ChunkStore(Docstore, AddableMixin):
+    """
+    SQLite-backed docstore. Chunk text, metadata and the float32 embedding
+    live on disk and are fetched by ID, so only the FAISS index and the
+    position -> ID map stay resident.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "id TEXT PRIMARY KEY, text TEXT NOT NULL, metadata TEXT, vector BLOB)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.commit()
+
+    # Only the path is pickled by FAISS.save_local. Unpickling opens nothing:
+    # the path is relative to wherever the index was saved, and
+    # load_vector_store swaps in the live store anyway.
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.path = state["path"]
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def search(self, search: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text, metadata FROM chunks WHERE id = ?", (search,)
+            ).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(id=search, page_content=row[0], metadata=json.loads(row[1] or "{}"))
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        rows = [(id_, doc.page_content, json.dumps(doc.metadata or {})) for id_, doc in texts.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (id, text, metadata) VALUES (?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def delete(self, ids: List) -> None:
+        with self._lock:
+            self._conn.executemany("DELETE FROM chunks WHERE id = ?", [(i,) for i in ids])
+            self._conn.commit()
+
+    def add_chunks(self, ids: List[str], texts: List[str], vectors: np.ndarray,
+                   metadatas: Optional[List[dict]] = None) -> None:
+        metadatas = metadatas or [{} for _ in texts]
+        rows = [
+            (id_, text, json.dumps(meta), vec.astype(np.float32).tobytes())
+            for id_, text, meta, vec in zip(ids, texts, metadatas, vectors)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (id, text, metadata, vector) VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def iter_vectors(self, batch_size: int = 10000):
+        """Yield batches of (id, text, vector or None) in insertion order."""
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT rowid, id, text, vector FROM chunks WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (last_rowid, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            last_rowid = rows[-1][0]
+            yield [(r[1], r[2], None if r[3] is None else np.frombuffer(r[3], dtype=np.float32)) for r in rows]
+
+    def set_vectors(self, ids: List[str], vectors: np.ndarray) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE chunks SET vector = ? WHERE id = ?",
+                [(vec.astype(np.float32).tobytes(), id_) for id_, vec in zip(ids, vectors)],
+            )
+            self._conn.commit()
+
+    def get_meta(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+            self._conn.commit()
+
+# -------------------------------
+
+# Index construction
+# -------------------------------
+
+def _pq_subquantizers(dim: int) -> int:
+    # PQ needs m to divide the dimension; take the largest divisor not above PQ_M.
+    for m in range(min(PQ_M, dim), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+def index_factory_string(index_type: str, dim: int, n_vectors: int) -> str:
+    nlist = max(1, min(65536, int(4 * math.sqrt(max(n_vectors, 1)))))
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "ivf":
+        return f"IVF{nlist},Flat"
+    if index_type == "ivfpq":
+        return f"IVF{nlist},PQ{_pq_subquantizers(dim)}"
+    if index_type == "ivfsq8":
+        return f"IVF{nlist},SQ8"
+    if index_type == "hnsw":
+        return f"HNSW{HNSW_M}"
+    if index_type == "sq8":
+        return "SQ8"
+    raise ValueError(f"Unknown index type '{index_type}'.")
+
+def apply_search_params(index) -> None:
+    """Set the recall/latency knobs (nprobe, efSearch) on a built index."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = NPROBE
+    index = faiss.downcast_index(index)
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = EF_SEARCH
+
+def train_min_vectors(index_type: str) -> int:
+    """TRAIN_MIN_VECTORS, raised to what the index type can actually be trained on."""
+    return max(TRAIN_MIN_VECTORS, PQ_MIN_TRAIN_VECTORS) if index_type == "ivfpq" else TRAIN_MIN_VECTORS
+
+def create_index(index_type: str, dim: int, training_vectors: Optional[np.ndarray] = None):
+    """
+    Build an empty FAISS index of the requested type. Types that need
+    training fall back to flat when fewer than TRAIN_MIN_VECTORS are given.
+    """
+    n = 0 if training_vectors is None else len(training_vectors)
+    if index_type in TRAINED_INDEX_TYPES and n < train_min_vectors(index_type):
+        index_type = "flat"
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dim)
+    index = faiss.index_factory(dim, index_factory_string(index_type, dim, n), faiss.METRIC_L2)
+    if index_type == "hnsw":
+        faiss.downcast_index(index).hnsw.efConstruction = EF_CONSTRUCTION
+    if not index.is_trained:
+        sample = training_vectors
+        if n > MAX_TRAIN_VECTORS:
+            rng = np.random.default_rng(0)
+            sample = training_vectors[rng.choice(n, MAX_TRAIN_VECTORS, replace=False)]
+        index.train(np.ascontiguousarray(sample, dtype=np.float32))
+    apply_search_params(index)
+    return index
+
+def _describe(index) -> str:
+    return faiss.downcast_index(index).__class__.__name__
+
+# -------------------------------
+
+# Vector store lifecycle
+# -------------------------------
+
+def open_chunk_store(cache_dir: str) -> ChunkStore:
+    return ChunkStore(os.path.join(cache_dir, CHUNK_DB_NAME))
+
+def rebuild_vector_store(embeddings, chunk_store: ChunkStore, index_type: str = INDEX_TYPE,
+                         pending: Optional[tuple] = None) -> Optional[FAISS]:
+    """
+    Training/rebuild step: read every stored vector back from the chunk
+    store (re-embedding any chunk saved without one), train a fresh index
+    of the configured type and add all vectors to it. pending is an
+    (ids, vectors) pair not yet written to the store, indexed after it.
+    """
+    ids: List[str] = []
+    batches: List[np.ndarray] = []
+    for batch in chunk_store.iter_vectors():
+        missing = [(id_, text) for id_, text, vec in batch if vec is None]
+        if missing:
+            fresh = np.asarray(embeddings.embed_documents([t for _, t in missing]), dtype=np.float32)
+            chunk_store.set_vectors([i for i, _ in missing], fresh)
+            fresh_by_id = dict(zip((i for i, _ in missing), fresh))
+        else:
+            fresh_by_id = {}
+        ids.extend(id_ for id_, _, _ in batch)
+        batches.append(np.stack([vec if vec is not None else fresh_by_id[id_] for id_, _, vec in batch]))
+    if pending is not None and len(pending[0]):
+        ids.extend(pending[0])
+        batches.append(pending[1])
+    if not ids:
+        return None
+
+    vectors = np.concatenate(batches).astype(np.float32)
+    index = create_index(index_type, vectors.shape[1], vectors)
+    index.add(vectors)
+    chunk_store.set_meta("trained_on", str(len(ids)))
+    chunk_store.set_meta("index_type", index_type)
+    print(f"Rebuilt FAISS index ({_describe(index)}) over {len(ids)} chunks.")
+    return FAISS(embeddings, index, chunk_store, {i: id_ for i, id_ in enumerate(ids)})
+
+def _needs_rebuild(vector_store: FAISS, chunk_store: ChunkStore, index_type: str, n: Optional[int] = None) -> bool:
+    n = chunk_store.count() if n is None else n
+    if index_type == "flat" or index_type == "hnsw":
+        return False
+    if n < train_min_vectors(index_type):
+        return False
+    if isinstance(vector_store.index, faiss.IndexFlatL2):
+        return True
+    trained_on = int(chunk_store.get_meta("trained_on", "0"))
+    return trained_on == 0 or n >= trained_on * REBUILD_GROWTH
+
+def add_chunks_to_vector_store(vector_store: Optional[FAISS], embeddings, chunk_store: ChunkStore,
+                               texts: Iterable[str], index_type: str = INDEX_TYPE,
+                               metadatas: Optional[List[dict]] = None) -> FAISS:
+    """
+    Embed new chunks and append them to the index, creating it on first use
+    and retraining it once the corpus has outgrown it. Chunks are persisted
+    only after the index update succeeds, so a failed rebuild never leaves
+    the store ahead of the index.
+    """
+    texts = list(texts)
+    with stage_timer("embed_documents"):
+        vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    ids = [str(uuid.uuid4()) for _ in texts]
+
+    if vector_store is None:
+        dim = vectors.shape[1]
+        # hnsw needs no training, so it is usable from the first chunk.
+        index = create_index(index_type, dim) if index_type == "hnsw" else faiss.IndexFlatL2(dim)
+        vector_store = FAISS(embeddings, index, chunk_store, {})
+
+    if _needs_rebuild(vector_store, chunk_store, index_type, chunk_store.count() + len(ids)):
+        with stage_timer("index_rebuild"):
+            vector_store = rebuild_vector_store(embeddings, chunk_store, index_type, pending=(ids, vectors))
+    else:
+        with stage_timer("index_add"), INDEX_LOCK:
+            start = len(vector_store.index_to_docstore_id)
+            vector_store.index.add(vectors)
+            vector_store.index_to_docstore_id.update({start + j: id_ for j, id_ in enumerate(ids)})
+        chunk_store.set_meta("index_type", index_type)
+
+    with stage_timer("chunk_store_write"):
+        chunk_store.add_chunks(ids, texts, vectors, metadatas)
+    return vector_store
+
+def save_vector_store(vector_store: FAISS, cache_dir: str):
+    """save_local without racing a concurrent index_add."""
+    with INDEX_LOCK:
+        vector_store.save_local(cache_dir)
+
+def load_vector_store(cache_dir: str, embeddings, chunk_store: ChunkStore,
+                      index_type: str = INDEX_TYPE) -> Optional[FAISS]:
+    """
+    Load a saved index. Indexes saved with the old in-memory docstore are
+    migrated into the chunk store once; a change of FAISS_INDEX_TYPE
+    triggers a rebuild from the stored vectors.
+    """
+    if not os.path.exists(os.path.join(cache_dir, "index.pkl")):
+        if not chunk_store.count():
+            return None
+        vector_store = rebuild_vector_store(embeddings, chunk_store, index_type)
+        vector_store.save_local(cache_dir)
+        return vector_store
+
+    vector_store = FAISS.load_local(cache_dir, embeddings, allow_dangerous_deserialization=True)
+    if not isinstance(vector_store.docstore, ChunkStore):
+        old_docstore = vector_store.docstore
+        positions = sorted(vector_store.index_to_docstore_id)
+        ids = [vector_store.index_to_docstore_id[i] for i in positions]
+        docs = [old_docstore.search(id_) for id_ in ids]
+        vectors = np.stack([vector_store.index.reconstruct(i) for i in positions])
+        chunk_store.add_chunks(ids, [d.page_content for d in docs], vectors, [d.metadata for d in docs])
+        print(f"Migrated {len(ids)} chunks to on-disk chunk store.")
+    vector_store.docstore = chunk_store
+    vector_store.save_local(cache_dir)
+
+    # Stores written before index types were configurable are flat.
+    if chunk_store.get_meta("index_type", "flat") != index_type or _needs_rebuild(vector_store, chunk_store, index_type):
+        vector_store = rebuild_vector_store(embeddings, chunk_store, index_type)
+        vector_store.save_local(cache_dir)
+        return vector_store
+    apply_search_params(vector_store.index)
+    return vector_store
+
+def batched_similarity_search(vector_store: FAISS, embeddings, queries: List[str], k: int) -> List[List[Document]]:
+    """
+    Embed all queries in one forward pass and answer them with a single
+    FAISS search call. Equivalent to calling similarity_search per query.
+    """
+    # embed_queries joins the query batcher, so concurrent batches share forward passes.
+    embed = getattr(embeddings, "embed_queries", embeddings.embed_documents)
+    with stage_timer("embed_queries"):
+        vectors = np.asarray(embed(queries), dtype=np.float32)
+    if vector_store._normalize_L2:
+        faiss.normalize_L2(vectors)
+    with stage_timer("similarity_search"), INDEX_LOCK:
+        _, indices = vector_store.index.search(vectors, k)
+        # Positions without an ID (none expected under the lock) are skipped, not raised.
+        id_rows = [[vector_store.index_to_docstore_id.get(int(i)) for i in row if i != -1] for row in indices]
+    results = []
+    for row in id_rows:
+        docs = []
+        for id_ in row:
+            if id_ is None:
+                continue
+            doc = vector_store.docstore.search(id_)
+            if isinstance(doc, Document):
+                docs.append(doc)
+        results.append(docs)
+    return results
@@ -0,0 +1,172 @@
+import fs from "fs";
+import path from "path";
+import crypto from "crypto";
+
+// Content-addressed upload store, sharing its layout with python/upload_store.py:
+//   uploads/<alias>.pdf            what routes and the FastAPI watcher see; a hard link to its blob
+//   uploads/blobs/<sha256>.pdf     one blob per unique document
+//   uploads/blobs/<sha256>.<kind>  artifacts derived from that blob (main2 .html, main1 outline)
+//   uploads/.tmp/                  uploads being hashed, linked into blobs/ when complete
+// The blob's hard-link count is its reference count, so a duplicate upload
+// costs one link and everything derived from the first copy is reused.
+
+// Times an upload is re-committed when its blob is collected before it could be linked.
+const COMMIT_ATTEMPTS = 3;
+
+export class UploadStore {
+  constructor(root) {
+    this.root = path.resolve(root);
+    this.blobDir = path.join(this.root, "blobs");
+    this.tmpDir = path.join(this.root, ".tmp");
+    fs.mkdirSync(this.blobDir, { recursive: true });
+    fs.mkdirSync(this.tmpDir, { recursive: true });
+  }
+
+  blobPath(sha, kind = "pdf") {
+    return path.join(this.blobDir, `${sha}.${kind}`);
+  }
+
+  aliasPath(alias) {
+    return path.join(this.root, path.basename(alias));
+  }
+
+  tmpPath() {
+    return path.join(this.tmpDir, crypto.randomUUID());
+  }
+
+  // Multer storage engine: hashes each file while it is written, keeps one
+  // blob per sha256 and exposes the upload under filename(file) as an alias.
+  // The file object gets the usual path/filename/size plus sha256 and blobPath.
+  multerStorage(filename) {
+    return {
+      _handleFile: (_req, file, cb) => {
+        const tmp = this.tmpPath();
+        const hash = crypto.createHash("sha256");
+        const out = fs.createWriteStream(tmp);
+        let size = 0;
+        let failed = false;
+        const fail = (err) => {
+          if (failed) return;
+          failed = true;
+          out.destroy();
+          fs.unlink(tmp, () => cb(err));
+        };
+        file.stream.on("data", (chunk) => {
+          hash.update(chunk);
+          size += chunk.length;
+        });
+        file.stream.on("error", fail);
+        out.on("error", fail);
+        out.on("finish", async () => {
+          if (failed) return;
+          try {
+            const sha = hash.digest("hex");
+            const alias = filename(file);
+            await this.store(tmp, sha, alias);
+            await fs.promises.unlink(tmp);
+            cb(null, {
+              destination: this.root,
+              filename: alias,
+              path: this.aliasPath(alias),
+              size,
+              sha256: sha,
+              blobPath: this.blobPath(sha),
+            });
+          } catch (err) {
+            fail(err);
+          }
+        });
+        file.stream.pipe(out);
+      },
+      _removeFile: (_req, file, cb) => {
+        this.removeAlias(file.filename, file.sha256).then(() => cb(null), cb);
+      },
+    };
+  }
+
+  // Commits tmp as the blob and links alias to it. If another request
+  // collects the blob in between, the link fails with ENOENT and the blob
+  // is committed again from tmp, which the caller removes afterwards.
+  async store(tmp, sha, alias) {
+    for (let attempt = 1; ; attempt += 1) {
+      await this.commit(tmp, sha);
+      try {
+        return await this.addAlias(sha, alias);
+      } catch (err) {
+        if (err.code !== "ENOENT" || attempt >= COMMIT_ATTEMPTS) throw err;
+      }
+    }
+  }
+
+  // Makes tmp the blob for sha unless one exists; link() fails with EEXIST
+  // rather than replacing it, so the first writer's inode (and its links) win.
+  async commit(tmp, sha) {
+    const blob = this.blobPath(sha);
+    try {
+      await fs.promises.link(tmp, blob);
+    } catch (err) {
+      if (err.code === "EEXIST") return; // Duplicate upload: keep the blob we already have.
+      // No hard links on this filesystem; aliases are copies there anyway.
+      await fs.promises.copyFile(tmp, blob, fs.constants.COPYFILE_EXCL).catch((e) => {
+        if (e.code !== "EEXIST") throw e;
+      });
+    }
+  }
+
+  // Points alias at the blob. Linked under a temporary name first and then
+  // renamed, so the FastAPI watcher never sees a partially written PDF.
+  async addAlias(sha, alias) {
+    const target = this.aliasPath(alias);
+    const blob = this.blobPath(sha);
+    const tmp = this.tmpPath();
+    try {
+      await fs.promises.link(blob, tmp);
+    } catch (err) {
+      if (err.code === "ENOENT") throw err;
+      // No hard links on this filesystem: fall back to a copy (not reference-counted).
+      await fs.promises.copyFile(blob, tmp);
+    }
+    await fs.promises.rename(tmp, target);
+  }
+
+  async refcount(sha) {
+    try {
+      return (await fs.promises.stat(this.blobPath(sha))).nlink - 1;
+    } catch {
+      return 0;
+    }
+  }
+
+  // Drops an alias and collects its blob once nothing references it.
+  async removeAlias(alias, sha) {
+    await fs.promises.unlink(this.aliasPath(alias)).catch(() => {});
+    if (sha) await this.collect(sha);
+  }
+
+  // Deletes the blob and everything derived from it if no alias is left.
+  async collect(sha) {
+    if ((await this.refcount(sha)) > 0) return false;
+    const names = await fs.promises.readdir(this.blobDir);
+    await Promise.all(
+      names
+        .filter((name) => name.startsWith(`${sha}.`))
+        .map((name) => fs.promises.unlink(path.join(this.blobDir, name)).catch(() => {}))
+    );
+    return true;
+  }
+
+  async readDerived(sha, kind) {
+    try {
+      return await fs.promises.readFile(this.blobPath(sha, kind), "utf-8");
+    } catch {
+      return null;
+    }
+  }
+
+  // Written to a temporary file and renamed, so concurrent readers never see half of it.
+  async writeDerived(sha, kind, data) {
+    const tmp = this.tmpPath();
+    await fs.promises.writeFile(tmp, data);
+    await fs.promises.rename(tmp, this.blobPath(sha, kind));
+  }
+}